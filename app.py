@@ -1,11 +1,43 @@
 from flask import Flask, render_template, request, jsonify, send_file, Response
-import subprocess
 import os
-import signal
-import time
+import re
+import glob
+import threading
+import config as cfg
+from log_rotation import follow_file
+from archive import SessionArchive, ArchiveIngestor, parse_time_param
+from report import create_pdf_report, REPORT_SETTINGS
+from report_cache import ReportCache
+from lifecycle import SessionSupervisor, default_command, read_status, STARTING, STOPPING
 
 app = Flask(__name__, static_folder="Frontend", template_folder="Frontend", static_url_path="")
-process = None  
+supervisor = SessionSupervisor(
+    cfg.STATUS_FILE,
+    default_command(),
+    heartbeat_timeout=cfg.HEARTBEAT_TIMEOUT,
+    start_timeout=cfg.START_TIMEOUT,
+    stop_timeout=cfg.STOP_TIMEOUT
+)
+archive = SessionArchive(cfg.ARCHIVE_DATABASE) if cfg.ARCHIVE_ENABLED else None
+archive_ingestor = None
+_ingestor_lock = threading.Lock()
+report_cache = ReportCache(cfg.REPORT_CACHE_DIRECTORY, int(cfg.REPORT_CACHE_MAX_MB * 1024 * 1024))
+
+def start_archive_ingestor():
+    """Start picking up finished sessions in the background (once per process)"""
+    global archive_ingestor
+    if archive is None or archive_ingestor is not None:
+        return
+    with _ingestor_lock:
+        if archive_ingestor is None:
+            archive_ingestor = ArchiveIngestor(archive, cfg.SESSION_ARCHIVE_DIRECTORY, cfg.ARCHIVE_SCAN_INTERVAL)
+            archive_ingestor.start()
+
+# Started by the process that serves requests: this covers `flask run` and any
+# WSGI server, and never the debug reloader's parent, which only watches files
+@app.before_request
+def ensure_archive_ingestor():
+    start_archive_ingestor()
 
 @app.route("/")
 def index():
@@ -15,68 +47,164 @@ def index():
 def features():
     return render_template("feature.html")
 
+# Start and stop return at once with an operation ID; poll /operations/<id>
+# or /session-status to follow the session through its states
 @app.route("/start-guard-ai", methods=["POST"])
 def start_guard_ai():
-    global process
     try:
-        if process is None:
-            # Use the python from the venv explicitly
-            venv_python = os.path.join(os.getcwd(), "venv", "bin", "python")
-            process = subprocess.Popen([venv_python, "main.py"], cwd=os.getcwd())
-            return jsonify({"status": "success", "message": "Guard AI started successfully!"})
-        else:
-            return jsonify({"status": "error", "message": "Guard AI is already running!"})
+        operation, error = supervisor.start()
+        if error:
+            return jsonify({"status": "error", "message": error})
+        return jsonify({"status": "success", "message": "Guard AI is starting...",
+                        "operation_id": operation["id"], "state": STARTING}), 202
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
 
 @app.route("/stop-guard-ai", methods=["POST"])
 def stop_guard_ai():
-    global process
     try:
-        if process is not None:
-            # Send SIGTERM to allow graceful shutdown and report generation
-            process.terminate()
-            try:
-                # Wait up to 5 seconds for the process to finish report generation
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                # If it doesn't stop, force kill it
-                process.kill()
-            
-            process = None
-            return jsonify({"status": "success", "message": "Guard AI stopped successfully!"})
-        else:
-            return jsonify({"status": "error", "message": "Guard AI is not running!"})
+        # SIGTERM only; the supervisor waits for the report in the background
+        operation, error = supervisor.stop()
+        if error:
+            return jsonify({"status": "error", "message": error})
+        return jsonify({"status": "success", "message": "Guard AI is stopping and writing the report...",
+                        "operation_id": operation["id"], "state": STOPPING}), 202
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
 
+@app.route("/operations/<operation_id>", methods=["GET"])
+def operation_status(operation_id):
+    operation = supervisor.get_operation(operation_id)
+    if operation is None:
+        return jsonify({"status": "error", "message": "Operation not found!"}), 404
+    return jsonify({"status": "success", "operation": operation, "session": supervisor.status()})
+
+@app.route("/session-status", methods=["GET"])
+def session_status():
+    return jsonify({"status": "success", **supervisor.status()})
+
+@app.route("/health", methods=["GET"])
+def health():
+    session = supervisor.status()
+    healthy = session["healthy"]
+    return jsonify({
+        "status": "ok" if healthy else "degraded",
+        "session_state": session["state"],
+        "heartbeat_age": session["heartbeat_age"],
+        "fps": session["fps"]
+    }), 200 if healthy else 503
+
+def _archived_report(session_id=None):
+    """Newest archived report of a session (or of any real session), or None"""
+    # By ID this also finds the load generator's synthetic_report_* archives
+    name = f"*_{session_id}.txt*" if session_id else "session_report_*.txt*"
+    # Archive names start with the session's timestamp, so the newest sorts last.
+    # Skip the compressor's temporary file; while both exist, the .gz sorts last
+    matches = sorted(path for path in glob.glob(os.path.join(cfg.SESSION_ARCHIVE_DIRECTORY, name))
+                     if path.endswith((".txt", ".txt.gz")))
+    return matches[-1] if matches else None
+
+def _session_report_path(session_id):
+    """Session data for a report: an archived session, or the last finished one"""
+    if session_id:
+        return _archived_report(session_id) if re.fullmatch(r"\w+", session_id) else None
+    # Never the live logs/session_report.txt: mid-session it is partial, and once
+    # the next session starts it belongs to that session
+    status = read_status(cfg.STATUS_FILE)
+    if status and status.get("report_path") and re.fullmatch(r"\w+", str(status.get("session_id"))):
+        finished = _archived_report(status["session_id"])
+        if finished:
+            return finished
+    return _archived_report()
+
 @app.route("/download-report", methods=["GET"])
 def download_report():
+    # Reports are cached by a hash of the session data, which is also the ETag,
+    # so repeat downloads answer If-None-Match with 304 and nothing is re-rendered
+    txt_path = _session_report_path(request.args.get("session"))
+    if txt_path:
+        try:
+            report_path, key, _ = report_cache.get_or_render(txt_path, create_pdf_report, REPORT_SETTINGS)
+        except FileNotFoundError:
+            # Pruned from the archive since it was looked up
+            report_path = None
+        if report_path:
+            return send_file(report_path, as_attachment=True, download_name="final_report.pdf",
+                             etag=key, conditional=True, max_age=0)
+
     report_path = "logs/final_report.pdf"
-    if os.path.exists(report_path):
-        return send_file(report_path, as_attachment=True)
+    if os.path.exists(report_path) and not request.args.get("session"):
+        return send_file(report_path, as_attachment=True, conditional=True, max_age=0)
     else:
         return jsonify({"status": "error", "message": "Report not found!"})
 
+@app.route("/report-cache/stats", methods=["GET"])
+def report_cache_stats():
+    return jsonify({"status": "success", **report_cache.stats()})
+
+def _page_limit(default):
+    try:
+        limit = int(request.args.get("limit", default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, cfg.ARCHIVE_PAGE_LIMIT))
+
+@app.route("/archive/sessions", methods=["GET"])
+def archive_sessions():
+    if archive is None:
+        return jsonify({"status": "error", "message": "Session archive is disabled!"}), 404
+    try:
+        sessions, next_cursor = archive.list_sessions(
+            limit=_page_limit(50),
+            cursor=request.args.get("cursor"),
+            since=parse_time_param(request.args.get("since")),
+            until=parse_time_param(request.args.get("until"))
+        )
+        return jsonify({"status": "success", "sessions": sessions, "next_cursor": next_cursor})
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route("/archive/sessions/<session_id>", methods=["GET"])
+def archive_session(session_id):
+    if archive is None:
+        return jsonify({"status": "error", "message": "Session archive is disabled!"}), 404
+    session = archive.get_session(session_id)
+    if session is None:
+        return jsonify({"status": "error", "message": "Session not found!"}), 404
+    return jsonify({"status": "success", "session": session})
+
+@app.route("/archive/events", methods=["GET"])
+def archive_events():
+    if archive is None:
+        return jsonify({"status": "error", "message": "Session archive is disabled!"}), 404
+    try:
+        events, next_cursor = archive.list_events(
+            session_id=request.args.get("session"),
+            event_type=request.args.get("type"),
+            since=parse_time_param(request.args.get("since")),
+            until=parse_time_param(request.args.get("until")),
+            limit=_page_limit(100),
+            cursor=request.args.get("cursor")
+        )
+        return jsonify({"status": "success", "events": events, "next_cursor": next_cursor})
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
 @app.route("/stream-logs")
 def stream_logs():
     def generate_logs():
         log_file = "logs/guard_ai_logs.txt"
         if not os.path.exists(log_file):
             yield "data: Waiting for logs...\n\n"
-            return
-
-        with open(log_file, "r") as f:
-            # Seek to end of file
-            f.seek(0, 2)
-            while True:
-                line = f.readline()
-                if line:
-                    yield f"data: {line}\n\n"
-                else:
-                    time.sleep(0.5)
+
+        # Follows the live file across size and per-session rotation
+        for line in follow_file(log_file):
+            yield f"data: {line}\n\n"
 
     return Response(generate_logs(), mimetype="text/event-stream")
 
 if __name__ == "__main__":
+    # Start ingesting before the first request, except in the reloader's parent
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_archive_ingestor()
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,314 @@
+"""
+Historical session archive for Guard AI.
+
+Finished session reports (logs/sessions/) are ingested into a local SQLite
+database with indexes on session, event type and time, so past sessions can
+be listed and filtered quickly. Listing uses keyset pagination: each page
+returns an opaque cursor holding the sort key of its last row, and the next
+page starts strictly after it, so deep pages cost the same as the first.
+
+Usage: python archive.py ingest
+"""
+import os
+import sys
+import glob
+import json
+import time
+import base64
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+from session_log import parse_session_report
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    ended_at REAL NOT NULL,
+    source_file TEXT,
+    ingested_at REAL NOT NULL,
+    event_count INTEGER NOT NULL,
+    speaking_count INTEGER NOT NULL,
+    speaking_seconds REAL NOT NULL,
+    looking_away_count INTEGER NOT NULL,
+    looking_away_seconds REAL NOT NULL,
+    multiple_persons_count INTEGER NOT NULL,
+    website_checks INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_started ON sessions (started_at, session_id);
+
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL REFERENCES sessions (session_id),
+    event_type TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL,
+    details TEXT,
+    clip TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_session ON events (session_id, start_ts, id);
+CREATE INDEX IF NOT EXISTS idx_events_type ON events (event_type, start_ts, id);
+CREATE INDEX IF NOT EXISTS idx_events_time ON events (start_ts, id);
+
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path TEXT PRIMARY KEY,
+    session_id TEXT,
+    ingested_at REAL NOT NULL
+);
+"""
+
+SESSION_COLUMNS = [
+    "session_id", "started_at", "ended_at", "event_count", "speaking_count", "speaking_seconds",
+    "looking_away_count", "looking_away_seconds", "multiple_persons_count", "website_checks"
+]
+EVENT_COLUMNS = ["id", "session_id", "event_type", "start_ts", "end_ts", "details", "clip"]
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, size=2):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    # Valid JSON is not enough: the queries unpack exactly `size` scalar values
+    if (not isinstance(values, list) or len(values) != size
+            or not all(isinstance(v, (int, float, str)) for v in values)):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _file_key(path):
+    """Archive key of a session file; a raw archive and its later .gz are the same file"""
+    key = os.path.basename(path)
+    return key[:-3] if key.endswith(".gz") else key
+
+
+def session_summary(parsed):
+    """Aggregate a parsed session report into a sessions row"""
+    events = parsed["events"]
+    started = parsed["started_at"].timestamp()
+    row = {
+        "session_id": parsed["session_id"],
+        "started_at": started,
+        "ended_at": started,
+        "event_count": len(events),
+        "speaking_count": 0,
+        "speaking_seconds": 0.0,
+        "looking_away_count": 0,
+        "looking_away_seconds": 0.0,
+        "multiple_persons_count": 0,
+        "website_checks": 0,
+    }
+    for event in events:
+        end = event["end"] or event["start"]
+        row["ended_at"] = max(row["ended_at"], end.timestamp())
+        duration = (end - event["start"]).total_seconds()
+        if event["type"] == "Speaking":
+            row["speaking_count"] += 1
+            row["speaking_seconds"] += duration
+        elif event["type"] == "Looking Away":
+            row["looking_away_count"] += 1
+            row["looking_away_seconds"] += duration
+        elif event["type"] == "Multiple Persons":
+            row["multiple_persons_count"] += 1
+        elif event["type"] == "Website Activity":
+            row["website_checks"] += 1
+    return row
+
+
+class SessionArchive:
+    """SQLite-backed store of finished sessions and their events"""
+
+    def __init__(self, db_path="logs/archive.db"):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # One connection per thread; Flask serves requests from several threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Ingestion ---
+
+    def ingest_parsed(self, parsed, source_file=None):
+        """Store one parsed session. Returns False if it was already archived."""
+        conn = self._connect()
+        row = session_summary(parsed)
+        with conn:
+            if source_file:
+                conn.execute("INSERT OR IGNORE INTO ingested_files (path, session_id, ingested_at) VALUES (?, ?, ?)",
+                             (source_file, row["session_id"], time.time()))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, started_at, ended_at, source_file, ingested_at, "
+                "event_count, speaking_count, speaking_seconds, looking_away_count, looking_away_seconds, "
+                "multiple_persons_count, website_checks) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (row["session_id"], row["started_at"], row["ended_at"], source_file, time.time(),
+                 row["event_count"], row["speaking_count"], row["speaking_seconds"], row["looking_away_count"],
+                 row["looking_away_seconds"], row["multiple_persons_count"], row["website_checks"])
+            )
+            if cur.rowcount == 0:
+                return False
+            conn.executemany(
+                "INSERT INTO events (session_id, event_type, start_ts, end_ts, details, clip) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(row["session_id"], e["type"], e["start"].timestamp(),
+                  e["end"].timestamp() if e["end"] else None, e["details"], e["clip"])
+                 for e in parsed["events"]]
+            )
+        return True
+
+    def ingest_file(self, path, known=None):
+        """Ingest a session report file once; returns True if anything new was stored"""
+        key = _file_key(path)
+        if known is not None:
+            if key in known:
+                return False
+        elif self._connect().execute("SELECT 1 FROM ingested_files WHERE path = ?", (key,)).fetchone():
+            return False
+        # The file row commits together with the session, so a crash never half-ingests
+        return self.ingest_parsed(parse_session_report(path), source_file=key)
+
+    def ingest_directory(self, sessions_dir):
+        """Ingest every session report in a directory that is not archived yet"""
+        count = 0
+        known = {row[0] for row in self._connect().execute("SELECT path FROM ingested_files")}
+        paths = glob.glob(os.path.join(sessions_dir, "session_report_*.txt"))
+        paths += glob.glob(os.path.join(sessions_dir, "session_report_*.txt.gz"))
+        for path in sorted(paths):
+            try:
+                if self.ingest_file(path, known):
+                    count += 1
+            except FileNotFoundError:
+                # Compressed and replaced between listing and reading; picked up next scan
+                continue
+            except Exception as e:
+                logging.error(f"Archive ingestion failed for {path}: {e}")
+        return count
+
+    # --- Queries ---
+
+    def get_session(self, session_id):
+        row = self._connect().execute(
+            f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def list_sessions(self, limit=50, cursor=None, since=None, until=None):
+        """Newest sessions first. Returns (rows, next_cursor)."""
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("started_at < ?")
+            params.append(until)
+        if cursor:
+            started_at, session_id = decode_cursor(cursor)
+            clauses.append("(started_at, session_id) < (?, ?)")
+            params += [started_at, session_id]
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions {where} "
+            f"ORDER BY started_at DESC, session_id DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+        rows = [dict(r) for r in rows]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1]["started_at"], rows[-1]["session_id"]])
+        return rows, next_cursor
+
+    def list_events(self, session_id=None, event_type=None, since=None, until=None, limit=100, cursor=None):
+        """Events in time order, optionally filtered. Returns (rows, next_cursor)."""
+        clauses, params = [], []
+        if session_id:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if event_type:
+            clauses.append("event_type = ?")
+            params.append(event_type)
+        if since is not None:
+            clauses.append("start_ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("start_ts < ?")
+            params.append(until)
+        if cursor:
+            start_ts, event_id = decode_cursor(cursor)
+            clauses.append("(start_ts, id) > (?, ?)")
+            params += [start_ts, event_id]
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"SELECT {', '.join(EVENT_COLUMNS)} FROM events {where} ORDER BY start_ts, id LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+        rows = [dict(r) for r in rows]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1]["start_ts"], rows[-1]["id"]])
+        return rows, next_cursor
+
+
+class ArchiveIngestor(threading.Thread):
+    """Background thread that picks up newly finished sessions"""
+
+    def __init__(self, archive, sessions_dir, interval=10.0):
+        super().__init__(name="archive-ingestor", daemon=True)
+        self.archive = archive
+        self.sessions_dir = sessions_dir
+        self.interval = interval
+        self._wake = threading.Event()
+
+    def scan_now(self):
+        self._wake.set()
+
+    def run(self):
+        while True:
+            try:
+                if os.path.isdir(self.sessions_dir):
+                    count = self.archive.ingest_directory(self.sessions_dir)
+                    if count:
+                        logging.info(f"Archived {count} finished session(s)")
+            except Exception as e:
+                logging.error(f"Archive scan failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+def parse_time_param(value):
+    """Accept a UNIX timestamp or an ISO date/time string"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+if __name__ == "__main__":
+    import config as cfg
+
+    if len(sys.argv) != 2 or sys.argv[1] != "ingest":
+        print("Usage: python archive.py ingest")
+        sys.exit(1)
+    archive = SessionArchive(cfg.ARCHIVE_DATABASE)
+    start = time.perf_counter()
+    count = archive.ingest_directory(cfg.SESSION_ARCHIVE_DIRECTORY)
+    print(f"✅ Ingested {count} session(s) in {time.perf_counter() - start:.2f}s")
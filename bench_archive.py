@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the SQLite session archive.
+
+Writes N synthetic session reports (gzip-compressed, like logs/sessions/),
+ingests them and then measures paginated queries: the first page versus a
+deep page reached through keyset cursors, compared with the OFFSET query a
+naive implementation would run. Also prints the query plans to confirm the
+indexes are used.
+
+Usage: python bench_archive.py [sessions] [events_per_session]
+"""
+import os
+import sys
+import gzip
+import time
+import random
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from archive import SessionArchive, encode_cursor
+
+EVENT_TYPES = ["Speaking", "Looking Away", "Multiple Persons", "Website Activity"]
+
+
+def write_sessions(sessions_dir, count, events_per_session):
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    for n in range(count):
+        session_id = f"{n:08x}"
+        started = start + timedelta(minutes=37 * n)
+        path = os.path.join(sessions_dir, f"session_report_{started:%Y%m%d-%H%M%S}_{session_id}.txt.gz")
+        with gzip.open(path, "wt") as f:
+            f.write(f"# Guard AI Session Report - {session_id}\n")
+            f.write(f"# Session Started: {started:%Y-%m-%d %H:%M:%S}\n\n")
+            t = started
+            for _ in range(events_per_session):
+                t += timedelta(seconds=rng.randint(5, 60))
+                kind = rng.choice(EVENT_TYPES)
+                if kind in ("Speaking", "Looking Away"):
+                    end = t + timedelta(seconds=rng.randint(1, 20))
+                    f.write(f"{kind} | {t:%H:%M:%S} | {end:%H:%M:%S}\n")
+                elif kind == "Multiple Persons":
+                    f.write(f"{kind} | {t:%H:%M:%S} | 2 persons detected\n")
+                else:
+                    f.write(f"{kind} | {t:%H:%M:%S} | Chrome: 3 tab(s) open\n")
+
+
+def timed(fn, repeats=50):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return np.median(samples)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    events_per_session = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    work_dir = tempfile.mkdtemp(prefix="guard_ai_archive_")
+    sessions_dir = os.path.join(work_dir, "sessions")
+    os.makedirs(sessions_dir)
+
+    print(f"Writing {count} sessions x {events_per_session} events...")
+    write_sessions(sessions_dir, count, events_per_session)
+
+    archive = SessionArchive(os.path.join(work_dir, "archive.db"))
+    start = time.perf_counter()
+    ingested = archive.ingest_directory(sessions_dir)
+    elapsed = time.perf_counter() - start
+    print(f"Ingested {ingested} sessions in {elapsed:.2f}s "
+          f"({ingested / elapsed:.0f} sessions/s, {ingested * events_per_session / elapsed:.0f} events/s)")
+
+    start = time.perf_counter()
+    archive.ingest_directory(sessions_dir)
+    print(f"Rescan with nothing new: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    conn = archive._connect()
+    limit = 50
+    deep = count - limit
+    row = conn.execute("SELECT started_at, session_id FROM sessions ORDER BY started_at DESC, session_id DESC "
+                       "LIMIT 1 OFFSET ?", (deep - 1,)).fetchone()
+    deep_cursor = encode_cursor([row["started_at"], row["session_id"]])
+
+    print("\nSessions (newest first, median of 50):")
+    print(f"  first page:              {timed(lambda: archive.list_sessions(limit=limit)):.2f} ms")
+    print(f"  page at row {deep} (cursor): {timed(lambda: archive.list_sessions(limit=limit, cursor=deep_cursor)):.2f} ms")
+    offset_sql = "SELECT * FROM sessions ORDER BY started_at DESC, session_id DESC LIMIT ? OFFSET ?"
+    print(f"  page at row {deep} (OFFSET): "
+          f"{timed(lambda: conn.execute(offset_sql, (limit, deep)).fetchall()):.2f} ms")
+
+    total_events = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    away_events = conn.execute("SELECT COUNT(*) FROM events WHERE event_type = 'Looking Away'").fetchone()[0]
+    row = conn.execute("SELECT start_ts, id FROM events WHERE event_type = 'Looking Away' "
+                       "ORDER BY start_ts, id LIMIT 1 OFFSET ?", (max(away_events - 101, 0),)).fetchone()
+    events_cursor = encode_cursor([row["start_ts"], row["id"]])
+    print(f"\nEvents ({total_events} total, type = Looking Away):")
+    print(f"  first page:  {timed(lambda: archive.list_events(event_type='Looking Away')):.2f} ms")
+    print(f"  deep page:   {timed(lambda: archive.list_events(event_type='Looking Away', cursor=events_cursor)):.2f} ms")
+    session_id = f"{count // 2:08x}"
+    print(f"  one session: {timed(lambda: archive.list_events(session_id=session_id)):.2f} ms")
+
+    print("\nQuery plans:")
+    plans = {
+        "sessions page": ("SELECT * FROM sessions WHERE (started_at, session_id) < (?, ?) "
+                          "ORDER BY started_at DESC, session_id DESC LIMIT 51", (1e12, "")),
+        "events by type": ("SELECT * FROM events WHERE event_type = ? AND (start_ts, id) > (?, ?) "
+                           "ORDER BY start_ts, id LIMIT 101", ("Speaking", 0, 0)),
+        "events by session": ("SELECT * FROM events WHERE session_id = ? ORDER BY start_ts, id LIMIT 101",
+                              (session_id,)),
+    }
+    for name, (sql, params) in plans.items():
+        detail = "; ".join(r["detail"] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+        print(f"  {name}: {detail}")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
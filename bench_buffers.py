@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-frame allocations with and without buffer reuse.
+
+Runs the detection hot loop (capture, flip, RGB conversion, FaceMesh,
+landmark and eye-region analysis) over a video source twice: allocating new
+arrays per frame as before, and with BUFFER_REUSE's preallocated
+FrameBuffers. A first pass with tracemalloc adds up the memory each step of
+a frame allocates (NumPy and OpenCV arrays are traced); a second pass without
+tracing measures frame latency.
+
+Usage: python bench_buffers.py [video_file_or_camera_index] [frames]
+"""
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from detection import FrameBuffers, create_face_mesh, analyze_faces
+
+
+def open_source(source):
+    return cv2.VideoCapture(int(source) if source.isdigit() else source)
+
+
+class AllocationMeter:
+    """Adds up what each step allocates: its traced peak above its starting point"""
+
+    def __init__(self):
+        self.total = 0
+        self._before = 0
+
+    def start(self):
+        self.total = 0
+        tracemalloc.reset_peak()
+        self._before = tracemalloc.get_traced_memory()[0]
+
+    def step(self):
+        current, peak = tracemalloc.get_traced_memory()
+        self.total += peak - self._before
+        tracemalloc.reset_peak()
+        self._before = current
+
+
+def run_mode(reuse, source, max_frames, face_mesh, iris_enabled, trace):
+    cap = open_source(source)
+    if not cap.isOpened():
+        print(f"❌ Cannot open source {source}")
+        sys.exit(1)
+    meter = AllocationMeter()
+    step = meter.step if trace else (lambda: None)
+    buffers = None
+    allocated = []
+    latencies = []
+    for n in range(max_frames + 1):
+        if trace:
+            meter.start()
+        start = time.perf_counter()
+
+        if buffers:
+            ret, frame = buffers.read(cap)
+        else:
+            ret, frame = cap.read()
+            step()
+        if not ret:
+            break
+        if not buffers:
+            frame = cv2.flip(frame, 1)
+            if reuse:
+                buffers = FrameBuffers(frame.shape)
+        step()
+        rgb_frame = buffers.to_rgb(frame) if buffers else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        step()
+        result = face_mesh.process(rgb_frame)
+        step()
+        analyze_faces(result.multi_face_landmarks, frame, iris_enabled, "contour", buffers)
+        step()
+
+        elapsed = time.perf_counter() - start
+        # The first frame sizes the buffers; measure the steady state only
+        if n == 0:
+            continue
+        latencies.append(elapsed * 1000)
+        allocated.append(meter.total)
+    cap.release()
+    return np.array(allocated), np.array(latencies)
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else "0"
+    max_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    face_mesh, iris_enabled = create_face_mesh()
+    if face_mesh is None:
+        sys.exit(1)
+
+    results = {}
+    for reuse in (False, True):
+        tracemalloc.start()
+        allocated, _ = run_mode(reuse, source, max_frames, face_mesh, iris_enabled, trace=True)
+        tracemalloc.stop()
+        _, latencies = run_mode(reuse, source, max_frames, face_mesh, iris_enabled, trace=False)
+        results[reuse] = (allocated, latencies)
+
+    print(f"\n{'Mode':<14} {'Frames':>6} {'KB alloc/frame':>15} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for reuse, (allocated, latencies) in results.items():
+        label = "buffer reuse" if reuse else "allocating"
+        print(f"{label:<14} {len(latencies):>6} {allocated.mean() / 1024:>15.1f} "
+              f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f} {latencies.max():>8.2f}")
+    face_mesh.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the evidence clip buffer.
+
+Feeds synthetic 640x480 frames at 30 FPS, fires an event every few seconds and
+reports the per-frame cost on the detection loop, encoder throughput and the
+memory held by the pre-event buffer.
+
+Usage: python bench_evidence.py [seconds]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+import psutil
+
+import config as cfg
+from evidence import EvidenceBuffer
+
+FPS = 30
+EVENT_INTERVAL = 4.0
+
+
+def make_frames(count, w=640, h=480):
+    """Pre-render frames with some texture so JPEG sizes are realistic"""
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+    base = cv2.GaussianBlur(base, (9, 9), 0)
+    frames = []
+    for i in range(count):
+        frame = np.roll(base, i * 7, axis=1)
+        cv2.putText(frame, f"frame {i}", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        frames.append(frame)
+    return frames
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+    total_frames = int(duration * FPS)
+    frames = make_frames(60)
+    clip_dir = tempfile.mkdtemp(prefix="guard_ai_evidence_")
+    proc = psutil.Process()
+    rss_before = proc.memory_info().rss
+
+    buffer = EvidenceBuffer(
+        "bench",
+        clip_dir=clip_dir,
+        max_bytes=int(cfg.EVIDENCE_BUFFER_MAX_MB * 1024 * 1024),
+        pre_seconds=cfg.EVIDENCE_PRE_SECONDS,
+        post_seconds=cfg.EVIDENCE_POST_SECONDS,
+        fps=cfg.EVIDENCE_FPS,
+        scale=cfg.EVIDENCE_SCALE,
+        jpeg_quality=cfg.EVIDENCE_JPEG_QUALITY,
+        workers=cfg.EVIDENCE_WORKERS
+    )
+
+    add_costs = []
+    peak_rss = rss_before
+    peak_buffer = 0
+    next_event = time.time() + EVENT_INTERVAL
+    start = time.time()
+    for i in range(total_frames):
+        deadline = start + i / FPS
+        delay = deadline - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+        t0 = time.perf_counter()
+        buffer.add_frame(frames[i % len(frames)])
+        if time.time() >= next_event:
+            buffer.capture("Speaking")
+            next_event += EVENT_INTERVAL
+        add_costs.append((time.perf_counter() - t0) * 1000)
+
+        if i % FPS == 0:
+            peak_rss = max(peak_rss, proc.memory_info().rss)
+            peak_buffer = max(peak_buffer, buffer.buffered_bytes)
+    elapsed = time.time() - start
+    buffer.close()
+
+    costs = np.array(add_costs)
+    clip_bytes = sum(
+        os.path.getsize(os.path.join(buffer.clip_dir, name)) for name in os.listdir(buffer.clip_dir)
+    )
+    print("=" * 60)
+    print("Guard AI Evidence Buffer Benchmark")
+    print("=" * 60)
+    print(f"Frames fed:            {total_frames} in {elapsed:.1f}s ({total_frames / elapsed:.1f} FPS)")
+    print(f"Loop cost per frame:   mean {costs.mean():.3f} ms | p99 {np.percentile(costs, 99):.3f} ms | max {costs.max():.3f} ms")
+    print(f"Frames encoded:        {buffer.frames_encoded} ({buffer.frames_encoded / elapsed:.1f}/s)")
+    print(f"Frames dropped:        {buffer.frames_dropped}")
+    print(f"Frames evicted:        {buffer.frames_evicted}")
+    print(f"Peak buffer size:      {peak_buffer / 1024 / 1024:.2f} MB (budget {cfg.EVIDENCE_BUFFER_MAX_MB} MB)")
+    print(f"Peak RSS growth:       {(peak_rss - rss_before) / 1024 / 1024:.1f} MB")
+    print(f"Clips written:         {buffer.clips_written} ({clip_bytes / 1024:.0f} KB total)")
+    shutil.rmtree(clip_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark: threaded FaceMesh vs. the inference worker process.
+
+Runs the detection pipeline (capture, flip, FaceMesh, landmark analysis) over
+a video source in both execution modes while a simulated audio listener runs
+in a background thread. The listener wakes every 10 ms and does the same
+NumPy work as audio_listener(); a wake-up that is more than one chunk late is
+counted as an audio gap, i.e. GIL contention that would have delayed audio.
+
+Usage: python bench_inference.py [video_file_or_camera_index] [frames]
+"""
+import sys
+import time
+import threading
+
+import cv2
+import numpy as np
+
+from detection import create_face_mesh, analyze_faces
+from inference_worker import InferenceWorker
+
+AUDIO_CHUNK = 0.01
+
+
+class SimulatedAudioListener(threading.Thread):
+    """Mimics audio_listener's per-chunk Python work and records late wake-ups"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.running = True
+        self.chunks = 0
+        self.gaps = 0
+        self.max_late = 0.0
+
+    def run(self):
+        samples = np.zeros((int(48000 * AUDIO_CHUNK), 1))
+        next_tick = time.perf_counter() + AUDIO_CHUNK
+        while self.running:
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            late = time.perf_counter() - next_tick
+            self.max_late = max(self.max_late, late)
+            if late > AUDIO_CHUNK:
+                self.gaps += 1
+            volume_norm = np.linalg.norm(samples) * 10
+            _ = volume_norm > 0.02
+            self.chunks += 1
+            next_tick = max(next_tick + AUDIO_CHUNK, time.perf_counter())
+
+
+def open_source(source):
+    return cv2.VideoCapture(int(source) if source.isdigit() else source)
+
+
+def run_mode(mode, source, max_frames):
+    cap = open_source(source)
+    if not cap.isOpened():
+        print(f"❌ Cannot open source {source}")
+        sys.exit(1)
+    ok, frame = cap.read()
+    if not ok:
+        print(f"❌ Cannot read from source {source}")
+        sys.exit(1)
+
+    face_mesh = None
+    worker = None
+    if mode == "thread":
+        face_mesh, iris_enabled = create_face_mesh()
+        if face_mesh is None:
+            sys.exit(1)
+    else:
+        worker = InferenceWorker(frame.shape)
+        if not worker.start():
+            sys.exit(1)
+        iris_enabled = worker.iris_enabled
+
+    audio = SimulatedAudioListener()
+    audio.start()
+    frames = 0
+    faces_seen = 0
+    pending = 0
+    start = time.perf_counter()
+    while frames < max_frames:
+        ok, frame = cap.read()
+        if not ok:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            continue
+        frame = cv2.flip(frame, 1)
+        if worker:
+            if worker.submit(frame):
+                pending += 1
+            if pending < 2:
+                continue
+            result = worker.get_result(timeout=5.0)
+            if result is None:
+                break
+            pending -= 1
+            faces_seen += result.num_faces
+        else:
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            result = face_mesh.process(rgb_frame)
+            faces = analyze_faces(result.multi_face_landmarks, frame, iris_enabled)
+            faces_seen += len(faces)
+        frames += 1
+    elapsed = time.perf_counter() - start
+
+    audio.running = False
+    audio.join()
+    cap.release()
+    if worker:
+        worker.close()
+
+    return {
+        "fps": frames / elapsed,
+        "faces": faces_seen / max(frames, 1),
+        "gap_rate": audio.gaps / max(audio.chunks, 1),
+        "max_late_ms": audio.max_late * 1000,
+    }
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else "0"
+    max_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    results = {mode: run_mode(mode, source, max_frames) for mode in ("thread", "process")}
+
+    print("=" * 60)
+    print("Guard AI Inference Mode Benchmark")
+    print("=" * 60)
+    print(f"{'Mode':<10}{'FPS':>10}{'Faces/frame':>14}{'Audio gaps':>14}{'Max late':>12}")
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['fps']:>10.1f}{r['faces']:>14.2f}{r['gap_rate']:>13.2%}{r['max_late_ms']:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
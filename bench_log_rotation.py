@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark for log rotation over a simulated 24-hour load.
+
+Replays a day of logging as fast as possible: detection events on the main
+log, website checks every 5 s on both logs and a per-session rollover every
+SESSION_MINUTES. A follow_file() tailer runs alongside to check that the
+/stream-logs reader keeps up across rotations. Reports the cost on the
+logging thread, rollover latency and peak/final disk usage.
+
+Usage: python bench_log_rotation.py [lines_per_second] [max_mb]
+"""
+import os
+import sys
+import time
+import shutil
+import logging
+import tempfile
+import threading
+
+import numpy as np
+
+from log_rotation import CompressingRotatingFileHandler, follow_file, compressor
+
+SIMULATED_SECONDS = 24 * 3600
+SESSION_MINUTES = 90
+WEBSITE_INTERVAL = 5
+
+
+def dir_size(path):
+    total = 0
+    for name in os.listdir(path):
+        try:
+            total += os.path.getsize(os.path.join(path, name))
+        except OSError:
+            pass
+    return total
+
+
+def main():
+    rate = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    max_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    log_dir = tempfile.mkdtemp(prefix="guard_ai_logs_")
+    main_path = os.path.join(log_dir, "guard_ai_logs.txt")
+    website_path = os.path.join(log_dir, "website_usage_logs.txt")
+
+    def make_logger(name, path):
+        logger = logging.getLogger(name)
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = CompressingRotatingFileHandler(path, max_bytes=int(max_mb * 1024 * 1024),
+                                                 backup_count=20, max_total_bytes=int(max_mb * 1024 * 1024) * 5)
+        handler.setFormatter(logging.Formatter("[bench] %(asctime)s - %(message)s"))
+        logger.addHandler(handler)
+        return logger, handler
+
+    main_logger, main_handler = make_logger("bench.main", main_path)
+    website_logger, website_handler = make_logger("bench.website", website_path)
+
+    tailed = [0]
+    stop = threading.Event()
+
+    def tail():
+        for _ in follow_file(main_path, poll_interval=0.01, from_end=False, should_stop=stop.is_set):
+            tailed[0] += 1
+
+    tailer = threading.Thread(target=tail, daemon=True)
+    tailer.start()
+
+    tabs = ", ".join(f"Tab {i} - Some page title about topic {i}" for i in range(8))
+    emit_costs = []
+    written = 0
+    peak_disk = 0
+    next_session = SESSION_MINUTES * 60
+    start = time.perf_counter()
+    for second in range(SIMULATED_SECONDS):
+        if second >= next_session:
+            main_handler.rotate_for_session()
+            website_handler.rotate_for_session()
+            next_session += SESSION_MINUTES * 60
+        for i in range(rate):
+            t0 = time.perf_counter()
+            main_logger.info(f"Speaking event logged: {i % 7 + 0.5:.1f}s | lip diff 3.21 | faces 1")
+            emit_costs.append(time.perf_counter() - t0)
+            written += 1
+        if second % WEBSITE_INTERVAL == 0:
+            t0 = time.perf_counter()
+            website_logger.info(f"Open tabs in Safari: [{tabs}]")
+            main_logger.info(f"Open tabs in Safari: [{tabs}]")
+            emit_costs.append(time.perf_counter() - t0)
+            written += 1
+        if second % 600 == 0:
+            peak_disk = max(peak_disk, dir_size(log_dir))
+    elapsed = time.perf_counter() - start
+
+    compressor.wait()
+    peak_disk = max(peak_disk, dir_size(log_dir))
+    deadline = time.time() + 10
+    while tailed[0] < written and time.time() < deadline:
+        time.sleep(0.05)
+    stop.set()
+    final_disk = dir_size(log_dir)
+    # Per log: the live file plus the retention cap on rotated segments
+    budget = 2 * (max_mb * 1024 * 1024) * 6
+
+    costs = np.array(emit_costs) * 1e6
+    rollovers = main_handler.rollovers + website_handler.rollovers
+    rollover_ms = (main_handler.rollover_seconds + website_handler.rollover_seconds) / max(rollovers, 1) * 1000
+    print("=" * 60)
+    print("Guard AI Log Rotation Benchmark (simulated 24 h)")
+    print("=" * 60)
+    print(f"Lines written:        {written} ({rate}/s main log) in {elapsed:.1f}s wall time")
+    print(f"Emit cost:            mean {costs.mean():.1f} us | p99 {np.percentile(costs, 99):.1f} us | max {costs.max():.0f} us")
+    print(f"Rollovers:            {rollovers} (mean {rollover_ms:.2f} ms on the logging thread)")
+    print(f"Segments kept:        {len(main_handler.segments())} main, {len(website_handler.segments())} website")
+    print(f"Disk usage:           peak {peak_disk / 1024 / 1024:.1f} MB, final {final_disk / 1024 / 1024:.1f} MB "
+          f"(bound {budget / 1024 / 1024:.0f} MB)")
+    print(f"Tailer lines:         {tailed[0]} of {written} main-log lines followed across rotations")
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
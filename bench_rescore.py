@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark for offline timeline re-scoring.
+
+Builds a synthetic hour-long session timeline (30 analysed frames per second
+with talking, glancing away and a second person now and then), then times:
+replaying one threshold set frame by frame the way the live loop does, one
+vectorized rescore(), and a parallel sweep over a threshold grid.
+
+Usage: python bench_rescore.py [minutes] [workers]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import numpy as np
+
+from detection import GAZE_CODES, MAX_FACES, LANDMARK_SUBSET
+from timeline import TimelineRecorder, load_timeline, rescore, sweep
+
+FPS = 30
+CENTER = GAZE_CODES["Looking Center"]
+LEFT = GAZE_CODES["Looking Left"]
+
+
+def write_timeline(out_dir, minutes):
+    """Synthetic session: behaviour changes in bursts of a few seconds"""
+    rng = np.random.default_rng(42)
+    frames = minutes * 60 * FPS
+    recorder = TimelineRecorder("bench000", out_dir, (640, 480), True, {})
+    landmarks = rng.random((MAX_FACES, len(LANDMARK_SUBSET), 2)).astype(np.float32)
+    talking = away = False
+    num_faces = 1
+    for n in range(frames):
+        if n % (FPS * 2) == 0:
+            talking = rng.random() < 0.3
+            away = rng.random() < 0.2
+            num_faces = int(rng.choice([0, 1, 2], p=[0.05, 0.9, 0.05]))
+        lip = rng.uniform(0, 8) if talking else rng.normal(3, 0.3)
+        faces = np.array([[lip, LEFT if away else CENTER]] * num_faces, dtype=np.float32)
+        audio = rng.uniform(0.02, 0.08) if talking else rng.uniform(0, 0.02)
+        recorder.add(n / FPS, num_faces, faces, audio, landmarks[:num_faces])
+    return recorder.close(), frames
+
+
+def replay(timeline, lip_threshold, audio_threshold, min_look_away, min_speaking):
+    """Frame-by-frame replay with the live loop's rules (the baseline)"""
+    previous, speaking_start, away_start = 0, None, None
+    speaking = looking_away = 0
+    columns = (timeline["ts"], timeline["audio_level"], timeline["lip_distance"], timeline["gaze_code"])
+    for ts, audio, lips, gazes in zip(*columns):
+        direction = None
+        for distance, gaze_code in zip(lips, gazes):
+            if gaze_code < 0:
+                break
+            lip_moving = abs(distance - previous) > lip_threshold
+            previous = distance
+            if lip_moving and audio > audio_threshold:
+                speaking_start = ts if speaking_start is None else speaking_start
+            elif speaking_start is not None:
+                speaking += ts - speaking_start >= min_speaking
+                speaking_start = None
+            direction = gaze_code
+        if direction != CENTER:
+            away_start = ts if away_start is None else away_start
+        elif away_start is not None:
+            looking_away += ts - away_start >= min_look_away
+            away_start = None
+    return speaking, looking_away
+
+
+def main():
+    minutes = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    work_dir = tempfile.mkdtemp(prefix="guard_ai_timeline_")
+
+    print(f"Recording a {minutes}-minute timeline at {FPS} FPS...")
+    start = time.perf_counter()
+    path, frames = write_timeline(work_dir, minutes)
+    elapsed = time.perf_counter() - start
+    print(f"Recorded {frames} frames in {elapsed:.2f}s ({elapsed / frames * 1e6:.1f} µs/frame), "
+          f"{os.path.getsize(path) / 1024 / 1024:.1f} MB on disk")
+
+    start = time.perf_counter()
+    timeline = load_timeline(path)
+    print(f"Loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    params = (2.0, 0.02, 2.0, 0.5)
+    start = time.perf_counter()
+    replay(timeline, *params)
+    replay_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(10):
+        rescore(timeline, *params)
+    rescore_time = (time.perf_counter() - start) / 10
+    print(f"\nOne threshold set: frame-by-frame replay {replay_time * 1000:.0f} ms, "
+          f"vectorized {rescore_time * 1000:.1f} ms ({replay_time / rescore_time:.0f}x)")
+
+    lip_values = [1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 5.0]
+    audio_values = [0.01, 0.015, 0.02, 0.03, 0.04]
+    look_away_values = [1.0, 2.0, 3.0, 5.0]
+    min_speaking_values = [0.25, 0.5, 1.0]
+    combinations = len(lip_values) * len(audio_values) * len(look_away_values) * len(min_speaking_values)
+    for n in sorted({1, workers}):
+        start = time.perf_counter()
+        sweep(path, lip_values, audio_values, look_away_values, min_speaking_values, workers=n)
+        elapsed = time.perf_counter() - start
+        print(f"Sweep of {combinations} combinations on {n} worker(s): {elapsed:.2f}s "
+              f"(estimated frame-by-frame: {replay_time * combinations:.0f}s)")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
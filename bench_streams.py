@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: multi-stream detection host scaling from 1 to 16 streams.
+
+Feeds N copies of a video file (paced at the file's own frame rate, looped,
+like N live cameras) through one StreamHost with a fixed FaceMesh pool and
+reports aggregate detections per second, the slowest stream's rate (a
+fairness check) and per-stream latency from capture to result.
+
+Usage: python bench_streams.py <video_file> [seconds] [pool_size] [target_fps]
+"""
+import sys
+import time
+import shutil
+import tempfile
+
+import numpy as np
+import psutil
+
+import config as cfg
+from stream_host import StreamHost
+
+STREAM_COUNTS = [1, 2, 4, 8, 16]
+
+
+def run(video, streams, seconds, pool_size, target_fps, mode):
+    out_dir = tempfile.mkdtemp(prefix="guard_ai_streams_")
+    host = StreamHost([(video, target_fps)] * streams, pool_size=pool_size,
+                      frame_size=(cfg.STREAM_FRAME_WIDTH, cfg.STREAM_FRAME_HEIGHT),
+                      mode=mode, out_dir=out_dir, loop=True)
+    if not host.start():
+        print("❌ Could not start the FaceMesh pool")
+        sys.exit(1)
+    proc = psutil.Process()
+    # Let capture threads deliver their first frames before measuring
+    time.sleep(1.0)
+    for session in host.sessions:
+        session.frames_inferred = 0
+        session.latencies.clear()
+    host._started_at = time.time()
+    proc.cpu_percent(None)
+    host.run(duration=seconds)
+    cpu = proc.cpu_percent(None) + sum(c.cpu_percent(None) for c in proc.children(recursive=True))
+    stats = host.stats()
+    host.close(write_reports=False)
+    shutil.rmtree(out_dir, ignore_errors=True)
+
+    fps = [s["fps"] for s in stats["streams"]]
+    p50 = np.median([s["latency_p50_ms"] for s in stats["streams"]])
+    p95 = max(s["latency_p95_ms"] for s in stats["streams"])
+    print(f"{streams:>7} | {stats['aggregate_fps']:>13.1f} | {np.mean(fps):>10.1f} | {min(fps):>10.1f} | "
+          f"{p50:>11.0f} | {p95:>11.0f} | {cpu:>5.0f}%")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python bench_streams.py <video_file> [seconds] [pool_size] [target_fps]")
+        sys.exit(1)
+    video = sys.argv[1]
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    pool_size = int(sys.argv[3]) if len(sys.argv) > 3 else cfg.STREAM_POOL_SIZE
+    target_fps = float(sys.argv[4]) if len(sys.argv) > 4 else cfg.STREAM_TARGET_FPS
+
+    print(f"{pool_size} FaceMesh instances ({cfg.INFERENCE_MODE} mode), target {target_fps:.0f} FPS per stream, "
+          f"{seconds:.0f}s per run")
+    print("streams | aggregate FPS | mean FPS   | min FPS    | p50 lat ms  | p95 lat ms  | CPU")
+    for streams in STREAM_COUNTS:
+        run(video, streams, seconds, pool_size, target_fps, cfg.INFERENCE_MODE)
+
+
+if __name__ == "__main__":
+    main()
@@ -26,14 +26,85 @@ MAX_ALLOWED_FACES = 1  # Maximum number of faces allowed
 REPORT_TITLE = "Guard AI - Proctoring Report"
 REPORT_INCLUDE_TIMESTAMPS = True
 REPORT_INCLUDE_SUMMARY = True
+REPORT_CACHE_DIRECTORY = "logs/report_cache"  # Rendered PDFs, keyed by a hash of the session data
+REPORT_CACHE_MAX_MB = 100  # Least recently used reports are evicted above this size
 
 # Camera Settings
 CAMERA_INDEX = 0  # Default camera (0 = built-in webcam)
 CAMERA_FLIP = True  # Flip camera horizontally
+DISPLAY_ENABLED = True  # Show the live preview window; set to False on headless hosts
 
 # Logging Settings
 LOG_DIRECTORY = "logs"
 ENABLE_DETAILED_LOGGING = True
+LOG_MAX_MB = 5  # Rotate a log file once it reaches this size
+LOG_BACKUP_COUNT = 20  # Rotated (gzip-compressed) segments kept per log file
+LOG_MAX_TOTAL_MB = 50  # Cap on disk used by rotated segments per log file
+LOG_ROTATE_PER_SESSION = True  # Start fresh log files for each monitoring session
+SESSION_ARCHIVE_DIRECTORY = "logs/sessions"  # Previous session reports are moved here
+SESSION_ARCHIVE_KEEP = 200  # Number of archived session reports kept
 
-# Demo Mode
-DEMO_MODE = False  # Set to True to generate random events for testing
+# Session Archive
+ARCHIVE_ENABLED = True  # Ingest finished sessions into a searchable SQLite archive
+ARCHIVE_DATABASE = "logs/archive.db"  # SQLite database file
+ARCHIVE_SCAN_INTERVAL = 10  # Seconds between scans for newly finished sessions
+ARCHIVE_PAGE_LIMIT = 500  # Maximum page size for archive queries
+
+# Multi-Stream Host (stream_host.py)
+STREAM_POOL_SIZE = 2  # FaceMesh instances shared by all streams (worker processes if INFERENCE_MODE = "process")
+STREAM_TARGET_FPS = 10  # Default detections per second for each stream
+STREAM_FRAME_WIDTH = 640  # Frames are resized to this size before inference
+STREAM_FRAME_HEIGHT = 480
+STREAM_DIRECTORY = "logs/streams"  # Per-stream session reports and PDFs
+STREAM_INFERENCE_TIMEOUT = 10.0  # A FaceMesh instance holding a frame longer than this is restarted
+
+# Session Lifecycle
+STATUS_FILE = "logs/guard_ai_status.json"  # Heartbeat written by the detection process
+HEARTBEAT_INTERVAL = 1.0  # Seconds between heartbeats
+HEARTBEAT_TIMEOUT = 15  # A stopping session is only killed after this long without a heartbeat
+START_TIMEOUT = 90  # Seconds allowed for the camera and face detection to come up
+STOP_TIMEOUT = 300  # Hard limit for writing the final report
+
+# Execution Mode
+INFERENCE_MODE = "thread"  # "thread" = FaceMesh in the detection thread, "process" = dedicated worker process
+BUFFER_REUSE = False  # Capture and process frames in preallocated buffers instead of new arrays per frame
+
+# CPU Governor
+CPU_GOVERNOR_ENABLED = False  # Adapt inference resolution, frame rate and gaze mode to CPU load
+CPU_BUDGET_PERCENT = 80  # Per-session CPU budget (100 = one full core, includes worker processes)
+SYSTEM_CPU_LIMIT_PERCENT = 90  # Reduce quality when whole-host CPU goes above this
+MIN_DETECTION_FPS = 10  # Never reduce the inference rate below this
+GOVERNOR_INTERVAL = 2.0  # Seconds between load samples
+
+# Evidence Clips
+EVIDENCE_CLIPS_ENABLED = True  # Save a short video clip around each logged event
+EVIDENCE_DIRECTORY = "logs/evidence"  # Clips are stored per session under this folder
+EVIDENCE_BUFFER_MAX_MB = 32  # Memory budget for the rolling pre-event buffer
+EVIDENCE_PRE_SECONDS = 5.0  # Seconds of video kept before the event
+EVIDENCE_POST_SECONDS = 3.0  # Seconds of video recorded after the event
+EVIDENCE_FPS = 10  # Frames per second sampled into the buffer
+EVIDENCE_SCALE = 0.5  # Downscale factor applied before JPEG compression
+EVIDENCE_JPEG_QUALITY = 70  # JPEG quality (0-100)
+EVIDENCE_WORKERS = 2  # Background encoder threads
+
+# Session Recording
+SESSION_RECORDING_ENABLED = False  # Record the full session through a separate encoder process
+RECORDING_DIRECTORY = "logs/recordings"  # Segments are stored per session under this folder
+RECORDING_FPS = 30  # Frame rate written to the video segments
+RECORDING_SEGMENT_SECONDS = 60  # Length of each video segment
+RECORDING_BUFFER_SLOTS = 32  # Shared-memory frames the encoder may fall behind by before dropping
+
+# Session Timeline (timeline.py)
+TIMELINE_ENABLED = False  # Record per-frame detection inputs so thresholds can be re-scored offline
+TIMELINE_DIRECTORY = "logs/timelines"  # Compressed timeline_<session>.npz files are written here
+
+# Demo Mode & Load Generator (load_generator.py)
+DEMO_MODE = False  # Set to True to generate synthetic events in a live session for testing
+DEMO_EVENT_RATE = 0.07  # Mean demo events per second (0.07 = about one every 15 s)
+LOAD_EVENT_RATE = 2.0  # Mean events per second per simulated session in load_generator.py
+LOAD_EVENT_MIX = {"Speaking": 1, "Looking Away": 1, "Multiple Persons": 1}  # Relative weight of each event type (also demo mode)
+LOAD_BURSTINESS = 1.0  # 1 = evenly random arrivals; N > 1 = bursts at N times the rate with quiet gaps between (also demo mode)
+LOAD_BURST_SECONDS = 2.0  # Mean length of a burst
+LOAD_SESSIONS = 20  # Simulated sessions run at once by load_generator.py
+LOAD_SESSION_SECONDS = 30  # Each simulated session ends, has its report downloaded and is replaced after this long
+LOAD_DURATION = 60  # Seconds load_generator.py runs for
@@ -0,0 +1,244 @@
+"""
+Face analysis shared by every Guard AI execution mode.
+
+Holds FaceMesh setup and the per-face landmark analysis (lip distance and
+gaze direction) so that the in-process detection loop and the inference
+worker process run exactly the same code.
+"""
+import logging
+
+import cv2
+import numpy as np
+
+# Landmark indices
+UPPER_LIP = [13, 14]
+LOWER_LIP = [17, 18]
+LEFT_EYE = [362, 385, 387, 263, 373, 380]
+RIGHT_EYE = [33, 160, 158, 133, 153, 144]
+LEFT_IRIS = [474, 475, 476, 477]
+RIGHT_IRIS = [469, 470, 471, 472]
+
+MAX_FACES = 2
+
+# Every landmark the analysis reads, in a fixed order (recorded in timelines)
+LANDMARK_SUBSET = UPPER_LIP + LOWER_LIP + LEFT_EYE + RIGHT_EYE + LEFT_IRIS + RIGHT_IRIS
+
+# Gaze directions travel between processes as small integer codes
+GAZE_DIRECTIONS = [
+    "Looking Center",
+    "Looking Left",
+    "Looking Right",
+    "Looking Up",
+    "Looking Down",
+    "Looking Away",
+    "Gaze Error",
+    "Gaze Unavailable",
+]
+GAZE_CODES = {name: code for code, name in enumerate(GAZE_DIRECTIONS)}
+
+
+def create_face_mesh(max_num_faces=MAX_FACES, static_image_mode=False):
+    """Create FaceMesh with iris tracking, falling back to standard mode.
+
+    static_image_mode disables tracking between frames; use it when one
+    instance sees frames from several cameras. Returns
+    (face_mesh, iris_tracking_enabled); face_mesh is None on failure.
+    """
+    import mediapipe as mp
+
+    try:
+        # Try initializing with refine_landmarks=True for Iris Tracking
+        face_mesh = mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=static_image_mode,
+            max_num_faces=max_num_faces,
+            refine_landmarks=True,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        print("✅ Face Mesh initialized successfully (Iris Tracking Enabled)")
+        logging.info("Face Mesh initialized with Iris Tracking")
+        return face_mesh, True
+    except Exception as e:
+        print(f"⚠️ Warning: High-precision tracking failed: {e}")
+        logging.warning(f"Iris tracking initialization failed: {e}")
+
+    try:
+        # Fallback to standard tracking (No Iris)
+        face_mesh = mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=static_image_mode,
+            max_num_faces=max_num_faces,
+            refine_landmarks=False,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        print("✅ Face Mesh initialized in Standard Mode (No Iris Tracking)")
+        logging.info("Face Mesh initialized in Standard Mode")
+        return face_mesh, False
+    except Exception as e2:
+        print(f"❌ Error initializing face detection: {e2}")
+        logging.error(f"Face detection initialization failed: {e2}")
+        return None, False
+
+
+class FrameBuffers:
+    """Preallocated images for one detection loop, sized from its first frame.
+
+    Capture, flip, colour conversion, resizing and the eye-region analysis
+    write into these arrays through OpenCV's dst outputs, so a steady-state
+    frame allocates no new image memory.
+    """
+
+    def __init__(self, shape, max_faces=MAX_FACES):
+        h, w = shape[:2]
+        self.shape = shape
+        self.raw = np.empty(shape, dtype=np.uint8)
+        self.frame = np.empty(shape, dtype=np.uint8)
+        self.rgb = np.empty(shape, dtype=np.uint8)
+        self.eye_gray = np.empty((h, w), dtype=np.uint8)
+        self.eye_mask = np.empty((h, w), dtype=np.uint8)
+        self.faces = np.zeros((max_faces, 2), dtype=np.float32)
+        self._scaled = {}
+
+    def read(self, cap):
+        """cap.read() into the capture buffer, then mirror it into .frame"""
+        ret, raw = cap.read(self.raw)
+        if not ret:
+            return False, None
+        if raw is not self.raw:
+            # The source changed resolution; keep going with its own array
+            return True, cv2.flip(raw, 1)
+        return True, cv2.flip(raw, 1, dst=self.frame)
+
+    def to_rgb(self, frame, scale=1.0):
+        """RGB copy of frame for FaceMesh, resized by scale"""
+        if frame.shape != self.shape:
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            return rgb if scale == 1.0 else cv2.resize(rgb, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        if scale == 1.0:
+            return self.rgb
+        h, w = self.shape[:2]
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        scaled = self._scaled.get(size)
+        if scaled is None:
+            # One buffer per governor scale level, allocated on first use
+            scaled = self._scaled[size] = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        return cv2.resize(self.rgb, size, dst=scaled, interpolation=cv2.INTER_AREA)
+
+
+# Lip Detection
+def get_lip_distance(landmarks, upper_lip_idx, lower_lip_idx, frame_w, frame_h):
+    upper_lip_points = np.array([(landmarks[i].x * frame_w, landmarks[i].y * frame_h) for i in upper_lip_idx])
+    lower_lip_points = np.array([(landmarks[i].x * frame_w, landmarks[i].y * frame_h) for i in lower_lip_idx])
+    return np.linalg.norm(np.mean(upper_lip_points, axis=0) - np.mean(lower_lip_points, axis=0))
+
+
+# Gaze Tracking
+def get_iris_position(landmarks, eye_landmarks, iris_landmarks, frame, buffers=None):
+    h, w, _ = frame.shape
+    eye_x = [int(landmarks[i].x * w) for i in eye_landmarks]
+    eye_y = [int(landmarks[i].y * h) for i in eye_landmarks]
+    x_min, y_min = min(eye_x), min(eye_y)
+    x_max, y_max = max(eye_x), max(eye_y)
+
+    eye_region = frame[y_min:y_max, x_min:x_max]
+    if buffers is not None:
+        # Work in views of frame-sized scratch images instead of new arrays
+        eh, ew = eye_region.shape[:2]
+        gray_eye = cv2.cvtColor(eye_region, cv2.COLOR_BGR2GRAY, dst=buffers.eye_gray[:eh, :ew])
+        _, threshold_eye = cv2.threshold(gray_eye, 50, 255, cv2.THRESH_BINARY_INV, dst=buffers.eye_mask[:eh, :ew])
+    else:
+        gray_eye = cv2.cvtColor(eye_region, cv2.COLOR_BGR2GRAY)
+        _, threshold_eye = cv2.threshold(gray_eye, 50, 255, cv2.THRESH_BINARY_INV)
+
+    contours, _ = cv2.findContours(threshold_eye, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    if contours:
+        contour = max(contours, key=cv2.contourArea)
+        (x, y, w_eye, h_eye) = cv2.boundingRect(contour)
+        cx = x + w_eye // 2
+        cy = y + h_eye // 2
+        if cx < eye_region.shape[1] // 3:
+            return "Looking Left"
+        elif cx > 2 * eye_region.shape[1] // 3:
+            return "Looking Right"
+        elif cy < eye_region.shape[0] // 3:
+            return "Looking Up"
+        elif cy > 2 * eye_region.shape[0] // 3:
+            return "Looking Down"
+        else:
+            return "Looking Center"
+    return "Looking Center"
+
+
+def get_iris_position_landmarks(landmarks, eye_landmarks, iris_landmarks):
+    """Cheaper gaze estimate from the iris centre relative to the eye landmarks.
+
+    Skips the eye crop, threshold and contour search; used when the CPU
+    governor has reduced detection quality.
+    """
+    eye_x = [landmarks[i].x for i in eye_landmarks]
+    eye_y = [landmarks[i].y for i in eye_landmarks]
+    cx = sum(landmarks[i].x for i in iris_landmarks) / len(iris_landmarks)
+    cy = sum(landmarks[i].y for i in iris_landmarks) / len(iris_landmarks)
+    x_min, x_max = min(eye_x), max(eye_x)
+    y_min, y_max = min(eye_y), max(eye_y)
+    if x_max <= x_min or y_max <= y_min:
+        return "Looking Center"
+    rx = (cx - x_min) / (x_max - x_min)
+    ry = (cy - y_min) / (y_max - y_min)
+    if rx < 1 / 3:
+        return "Looking Left"
+    elif rx > 2 / 3:
+        return "Looking Right"
+    elif ry < 1 / 3:
+        return "Looking Up"
+    elif ry > 2 / 3:
+        return "Looking Down"
+    return "Looking Center"
+
+
+def landmark_subset(multi_face_landmarks, max_faces=MAX_FACES):
+    """Normalised (x, y) of LANDMARK_SUBSET for each face, as a (num_faces, points, 2) array"""
+    if not multi_face_landmarks:
+        return np.zeros((0, len(LANDMARK_SUBSET), 2), dtype=np.float32)
+    faces = multi_face_landmarks[:max_faces]
+    points = np.zeros((len(faces), len(LANDMARK_SUBSET), 2), dtype=np.float32)
+    for row, landmarks in enumerate(faces):
+        lm = landmarks.landmark
+        points[row] = [(lm[i].x, lm[i].y) for i in LANDMARK_SUBSET]
+    return points
+
+
+def analyze_faces(multi_face_landmarks, frame, iris_tracking_enabled, gaze_mode="contour", buffers=None):
+    """Reduce FaceMesh output to a compact (num_faces, 2) array.
+
+    Each row is [lip distance in pixels, gaze direction code]. gaze_mode is
+    "contour" (eye-region image analysis) or "landmarks" (iris landmarks only).
+    With FrameBuffers, the result and the eye images reuse preallocated arrays.
+    """
+    if not multi_face_landmarks:
+        return np.zeros((0, 2), dtype=np.float32) if buffers is None else buffers.faces[:0]
+    h, w, _ = frame.shape
+    if buffers is None or len(multi_face_landmarks) > len(buffers.faces):
+        faces = np.zeros((len(multi_face_landmarks), 2), dtype=np.float32)
+    else:
+        faces = buffers.faces[:len(multi_face_landmarks)]
+    for row, landmarks in enumerate(multi_face_landmarks):
+        faces[row, 0] = get_lip_distance(landmarks.landmark, UPPER_LIP, LOWER_LIP, w, h)
+
+        # Gaze Tracking (Only if Iris Tracking is enabled)
+        if iris_tracking_enabled:
+            try:
+                if gaze_mode == "landmarks":
+                    left_eye_direction = get_iris_position_landmarks(landmarks.landmark, LEFT_EYE, LEFT_IRIS)
+                    right_eye_direction = get_iris_position_landmarks(landmarks.landmark, RIGHT_EYE, RIGHT_IRIS)
+                else:
+                    left_eye_direction = get_iris_position(landmarks.landmark, LEFT_EYE, LEFT_IRIS, frame, buffers)
+                    right_eye_direction = get_iris_position(landmarks.landmark, RIGHT_EYE, RIGHT_IRIS, frame, buffers)
+                direction = left_eye_direction if left_eye_direction == right_eye_direction else "Looking Away"
+            except Exception:
+                direction = "Gaze Error"
+        else:
+            direction = "Gaze Unavailable"
+        faces[row, 1] = GAZE_CODES[direction]
+    return faces
@@ -0,0 +1,239 @@
+"""
+Evidence clip capture for Guard AI.
+
+Keeps a rolling buffer of JPEG-compressed frames within a fixed memory budget
+and writes a short video clip around each logged event. JPEG and video
+encoding run on a background thread pool, so the detection loop only pays for
+a downscaled frame copy.
+
+Clips cover the event's onset. Events that are only logged when they end
+(speaking, looking away) request their clip when they start, unconfirmed,
+and confirm or discard it once they know whether the event counts.
+"""
+import os
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+class _PendingClip:
+    """A clip that is still collecting post-event frames"""
+
+    def __init__(self, path, event_type, event_ts, deadline, frames, confirmed):
+        self.path = path
+        self.event_type = event_type
+        self.event_ts = event_ts
+        self.deadline = deadline
+        self.frames = frames
+        self.bytes = sum(len(data) for _, data in frames)
+        self.confirmed = confirmed
+        self.complete = False  # All post-event frames collected
+
+
+class EvidenceBuffer:
+    """Rolling pre-event buffer that turns logged events into short clips"""
+
+    def __init__(self, session_id, clip_dir="logs/evidence", max_bytes=32 * 1024 * 1024,
+                 pre_seconds=5.0, post_seconds=3.0, fps=10, scale=0.5,
+                 jpeg_quality=70, workers=2):
+        self.session_id = session_id
+        self.clip_dir = os.path.join(clip_dir, session_id)
+        self.max_bytes = max_bytes
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.fps = fps
+        self.scale = scale
+        self.jpeg_quality = jpeg_quality
+        self.max_pending = workers * 4
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="evidence")
+        self._lock = threading.Lock()
+        self._ring = deque()  # (timestamp, jpeg bytes)
+        self._ring_bytes = 0
+        # Frames held by pending clips count against max_bytes too (frames also
+        # still in the ring are counted twice, so the bound is conservative)
+        self._held_bytes = 0
+        self._pending_clips = []
+        self._pending_encodes = 0
+        self._next_sample = 0.0
+        self._clip_counter = 0
+        self._closed = False
+
+        # Counters for benchmarks and the shutdown summary
+        self.frames_encoded = 0
+        self.frames_dropped = 0
+        self.frames_evicted = 0
+        self.clips_written = 0
+
+        os.makedirs(self.clip_dir, exist_ok=True)
+
+    # --- Detection loop side (must stay cheap) ---
+
+    def add_frame(self, frame, timestamp=None):
+        """Sample a frame into the buffer. Never blocks on encoding."""
+        if self._closed:
+            return
+        now = time.time() if timestamp is None else timestamp
+        if now < self._next_sample:
+            return
+        self._next_sample = max(self._next_sample + 1.0 / self.fps, now - 1.0 / self.fps)
+
+        with self._lock:
+            if self._pending_encodes >= self.max_pending:
+                # Encoder is behind; drop rather than stall the caller
+                self.frames_dropped += 1
+                return
+            self._pending_encodes += 1
+
+        if self.scale != 1.0:
+            small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        else:
+            small = frame.copy()
+        self._executor.submit(self._encode_frame, now, small)
+
+    def capture(self, event_type, timestamp=None, confirmed=True):
+        """Request a clip around an event and return the path it will be written to.
+
+        With confirmed=False the clip is only written after confirm(path);
+        discard(path) drops it. Call at the event's start: the buffer only
+        reaches pre_seconds back.
+        """
+        if self._closed:
+            return None
+        now = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self._clip_counter += 1
+            slug = event_type.lower().replace(" ", "_")
+            filename = f"{self._clip_counter:04d}_{slug}_{time.strftime('%H%M%S', time.localtime(now))}.avi"
+            path = os.path.join(self.clip_dir, filename)
+            start = now - self.pre_seconds
+            frames = [item for item in self._ring if item[0] >= start]
+            clip = _PendingClip(path, event_type, now, now + self.post_seconds, frames, confirmed)
+            self._pending_clips.append(clip)
+            self._held_bytes += clip.bytes
+        return path
+
+    def confirm(self, path):
+        """Write an unconfirmed clip once its post-event frames are in"""
+        with self._lock:
+            clip = self._find_clip(path)
+            if clip is None:
+                return
+            clip.confirmed = True
+            if not clip.complete:
+                return
+            self._release_clip(clip)
+        self._executor.submit(self._write_clip, clip)
+
+    def discard(self, path):
+        """Drop an unconfirmed clip (the event did not count)"""
+        with self._lock:
+            clip = self._find_clip(path)
+            if clip is not None:
+                self._release_clip(clip)
+
+    def _find_clip(self, path):
+        for clip in self._pending_clips:
+            if clip.path == path:
+                return clip
+        return None
+
+    def _release_clip(self, clip):
+        self._pending_clips.remove(clip)
+        self._held_bytes -= clip.bytes
+
+    # --- Background side ---
+
+    def _encode_frame(self, timestamp, frame):
+        try:
+            ok, encoded = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+            if not ok:
+                return
+            data = encoded.tobytes()
+            ready = []
+            with self._lock:
+                self._ring.append((timestamp, data))
+                self._ring_bytes += len(data)
+                self.frames_encoded += 1
+
+                for clip in self._pending_clips:
+                    if timestamp <= clip.deadline:
+                        if self._held_bytes + len(data) > self.max_bytes:
+                            # Pending clips alone fill the budget: cut this one short
+                            self.frames_dropped += 1
+                            continue
+                        clip.frames.append((timestamp, data))
+                        clip.bytes += len(data)
+                        self._held_bytes += len(data)
+                    elif not clip.complete:
+                        clip.complete = True
+                        if clip.confirmed:
+                            ready.append(clip)
+                for clip in ready:
+                    self._release_clip(clip)
+
+                # Only the pre-event window is useful; the byte budget caps it
+                oldest = timestamp - self.pre_seconds
+                while self._ring and (self._ring_bytes + self._held_bytes > self.max_bytes
+                                      or self._ring[0][0] < oldest):
+                    _, old = self._ring.popleft()
+                    self._ring_bytes -= len(old)
+                    self.frames_evicted += 1
+            for clip in ready:
+                self._executor.submit(self._write_clip, clip)
+        except Exception as e:
+            logging.error(f"Evidence frame encoding failed: {e}")
+        finally:
+            with self._lock:
+                self._pending_encodes -= 1
+
+    def _write_clip(self, clip):
+        frames = sorted(clip.frames, key=lambda item: item[0])
+        if not frames:
+            logging.warning(f"No frames buffered for {clip.event_type} clip, skipping {clip.path}")
+            return
+        try:
+            first = cv2.imdecode(np.frombuffer(frames[0][1], dtype=np.uint8), cv2.IMREAD_COLOR)
+            h, w = first.shape[:2]
+            writer = cv2.VideoWriter(clip.path, cv2.VideoWriter_fourcc(*"MJPG"), self.fps, (w, h))
+            writer.write(first)
+            for _, data in frames[1:]:
+                writer.write(cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR))
+            writer.release()
+            with self._lock:
+                self.clips_written += 1
+            logging.info(f"Evidence clip written: {clip.path} ({len(frames)} frames)")
+        except Exception as e:
+            logging.error(f"Evidence clip write failed for {clip.path}: {e}")
+
+    @property
+    def buffered_bytes(self):
+        """Bytes in the rolling buffer plus bytes held by pending clips"""
+        return self._ring_bytes + self._held_bytes
+
+    def close(self):
+        """Flush clips still waiting for post-event frames and stop the encoders"""
+        if self._closed:
+            return
+        self._closed = True
+        # Let in-flight encodes land before flushing pending clips; unconfirmed
+        # ones belong to events still running, which are never logged
+        while True:
+            with self._lock:
+                if self._pending_encodes == 0:
+                    ready = [clip for clip in self._pending_clips if clip.confirmed]
+                    self._pending_clips.clear()
+                    self._held_bytes = 0
+                    break
+            time.sleep(0.01)
+        for clip in ready:
+            self._executor.submit(self._write_clip, clip)
+        self._executor.shutdown(wait=True)
+        print(f"[Evidence] {self.clips_written} clips written, {self.frames_dropped} frames dropped")
+        logging.info(f"Evidence buffer closed: {self.clips_written} clips, "
+                     f"{self.frames_encoded} frames encoded, {self.frames_dropped} dropped")
@@ -0,0 +1,107 @@
+"""
+Shared-memory frame ring for handing raw frames to another process.
+
+Single producer, single consumer. The producer copies each frame once into the
+next slot and publishes it by bumping a shared write counter; the consumer
+reads frames in place and releases them by bumping a shared read counter.
+When every slot is still in use the producer drops the frame instead of
+waiting, so the caller's frame rate never depends on the consumer.
+"""
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class FrameRing:
+    """A fixed number of equally sized frame slots backed by shared memory"""
+
+    def __init__(self, ctx, shape, slots, dtype=np.uint8, _spec=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        self.slot_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        size = self.slot_bytes * slots + 8 * slots
+
+        if _spec is None:
+            self._owner = True
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.write_seq = ctx.Value("q", 0)
+            self.read_seq = ctx.Value("q", 0)
+        else:
+            self._owner = False
+            self.shm = _attach(_spec["name"])
+            self.write_seq = _spec["write_seq"]
+            self.read_seq = _spec["read_seq"]
+
+        self.frames = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf)
+        self.timestamps = np.ndarray((slots,), dtype=np.float64, buffer=self.shm.buf,
+                                     offset=self.slot_bytes * slots)
+        self._write = self.write_seq.value
+        self._read = self.read_seq.value
+
+    def spec(self):
+        """Picklable description passed to the consumer process at start-up"""
+        return {
+            "name": self.shm.name, "shape": self.shape, "slots": self.slots,
+            "dtype": self.dtype.str, "write_seq": self.write_seq, "read_seq": self.read_seq
+        }
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(None, spec["shape"], spec["slots"], dtype=spec["dtype"], _spec=spec)
+
+    # --- Producer side ---
+
+    def in_use(self):
+        """Slots written but not yet released by the consumer"""
+        return self._write - self.read_seq.value
+
+    def push(self, frame, timestamp):
+        """Copy a frame into the next slot. Returns False if the ring is full."""
+        if self._write - self.read_seq.value >= self.slots:
+            return False
+        slot = self._write % self.slots
+        np.copyto(self.frames[slot], frame)
+        self.timestamps[slot] = timestamp
+        self._write += 1
+        self.write_seq.value = self._write
+        return True
+
+    # --- Consumer side ---
+
+    def peek(self, timeout=None):
+        """Return (slot, timestamp) of the oldest unread frame, or None on timeout"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self._read >= self.write_seq.value:
+            if deadline is not None and time.time() >= deadline:
+                return None
+            time.sleep(0.002)
+        slot = self._read % self.slots
+        return slot, float(self.timestamps[slot])
+
+    def release(self):
+        """Hand the oldest slot back to the producer"""
+        self._read += 1
+        self.read_seq.value = self._read
+
+    def close(self):
+        """Release this process's mapping (and the segment itself if we created it)"""
+        self.frames = None
+        self.timestamps = None
+        self.shm.close()
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _attach(name):
+    try:
+        # Python 3.13+: only the owner should track (and unlink) the segment
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Older versions: spawned children share the parent's resource
+        # tracker, so the duplicate registration is harmless
+        return shared_memory.SharedMemory(name=name)
@@ -0,0 +1,169 @@
+"""
+CPU-budget governor for the detection loop.
+
+Samples this session's CPU use (including child processes such as the
+inference worker), system CPU and per-stage latency, and steps through a
+fixed ladder of quality levels to stay within a per-session CPU budget and a
+per-frame time budget while keeping at least a minimum detection rate. Each level trades off inference
+resolution, inference frame stride and the gaze-estimation mode.
+"""
+import time
+import logging
+
+import psutil
+
+# Ordered from full quality to the cheapest setting
+QUALITY_LEVELS = [
+    {"scale": 1.0, "stride": 1, "gaze": "contour"},
+    {"scale": 0.75, "stride": 1, "gaze": "contour"},
+    {"scale": 0.75, "stride": 1, "gaze": "landmarks"},
+    {"scale": 0.5, "stride": 2, "gaze": "landmarks"},
+    {"scale": 0.5, "stride": 3, "gaze": "landmarks"},
+]
+
+
+def describe_level(index):
+    level = QUALITY_LEVELS[index]
+    stride = "every frame" if level["stride"] == 1 else f"every {level['stride']} frames"
+    return f"level {index}: {int(level['scale'] * 100)}% resolution, inference {stride}, {level['gaze']} gaze"
+
+
+class CpuGovernor:
+    """Adapts detection quality to a per-session CPU budget"""
+
+    def __init__(self, cpu_budget=80.0, min_detection_fps=10.0, system_cpu_limit=90.0,
+                 interval=2.0, cooldown=6.0, target_fps=30.0, on_change=None):
+        self.cpu_budget = cpu_budget
+        self.target_fps = target_fps
+        self.min_detection_fps = min_detection_fps
+        self.system_cpu_limit = system_cpu_limit
+        self.interval = interval
+        self.cooldown = cooldown
+        self.on_change = on_change
+
+        self.level = 0
+        self.stage_ms = {}
+        self.process_cpu = 0.0
+        self.system_cpu = 0.0
+        self.capture_fps = 0.0
+        self.detection_fps = 0.0
+
+        self._proc = psutil.Process()
+        self._children = {}
+        self._proc.cpu_percent(None)
+        psutil.cpu_percent(None)
+        self._window_start = time.time()
+        self._last_change = 0.0
+        self._frames = 0
+        self._inferred = 0
+        self._frame_index = 0
+
+    @property
+    def settings(self):
+        return QUALITY_LEVELS[self.level]
+
+    def should_infer(self):
+        """Count a captured frame and say whether inference should run on it"""
+        self._frame_index += 1
+        self._frames += 1
+        run = self._frame_index % self.settings["stride"] == 0
+        if run:
+            self._inferred += 1
+        return run
+
+    def record_stage(self, stage, seconds):
+        """Track an exponential moving average of a stage's latency"""
+        ms = seconds * 1000
+        previous = self.stage_ms.get(stage)
+        self.stage_ms[stage] = ms if previous is None else previous * 0.9 + ms * 0.1
+
+    def frame_budget_ms(self, level=None):
+        """Time available per inference at a level's detection rate"""
+        stride = QUALITY_LEVELS[self.level if level is None else level]["stride"]
+        return stride * 1000.0 / self.target_fps
+
+    def _inference_ms(self):
+        # Analysis only runs on inferred frames, so it shares the same budget
+        return self.stage_ms.get("inference", 0.0) + self.stage_ms.get("analysis", 0.0)
+
+    def _session_cpu(self):
+        total = self._proc.cpu_percent(None)
+        try:
+            children = self._proc.children(recursive=True)
+        except psutil.Error:
+            children = []
+        alive = {}
+        for child in children:
+            cached = self._children.get(child.pid)
+            if cached is None:
+                # First sample primes the counter and reads as 0
+                cached = child
+                cached.cpu_percent(None)
+            else:
+                try:
+                    total += cached.cpu_percent(None)
+                except psutil.Error:
+                    continue
+            alive[child.pid] = cached
+        self._children = alive
+        return total
+
+    def update(self, now=None):
+        """Sample load and adjust the quality level. Returns True if it changed."""
+        now = time.time() if now is None else now
+        elapsed = now - self._window_start
+        if elapsed < self.interval:
+            return False
+
+        self.process_cpu = self._session_cpu()
+        self.system_cpu = psutil.cpu_percent(None)
+        self.capture_fps = self._frames / elapsed
+        self.detection_fps = self._inferred / elapsed
+        self._window_start = now
+        self._frames = 0
+        self._inferred = 0
+
+        if now - self._last_change < self.cooldown:
+            return False
+
+        inference_ms = self._inference_ms()
+        over_frame_budget = inference_ms > self.frame_budget_ms()
+        overloaded = (self.process_cpu > self.cpu_budget or self.system_cpu > self.system_cpu_limit
+                      or over_frame_budget)
+        relaxed = (self.process_cpu < self.cpu_budget * 0.6 and self.system_cpu < self.system_cpu_limit * 0.8
+                   and (self.level == 0 or inference_ms < self.frame_budget_ms(self.level - 1) * 0.6))
+        target = self.level
+        reason = None
+
+        if self.detection_fps < self.min_detection_fps and self.settings["stride"] > 1:
+            target = self.level - 1
+            reason = f"detection rate {self.detection_fps:.1f} FPS below minimum {self.min_detection_fps:.0f}"
+        elif overloaded and self.level < len(QUALITY_LEVELS) - 1:
+            next_stride = QUALITY_LEVELS[self.level + 1]["stride"]
+            if self.capture_fps / next_stride >= self.min_detection_fps:
+                target = self.level + 1
+                if over_frame_budget:
+                    reason = (f"inference {inference_ms:.1f} ms over the {self.frame_budget_ms():.1f} ms "
+                              f"frame budget at {self.target_fps:.0f} FPS")
+                else:
+                    reason = (f"session CPU {self.process_cpu:.0f}% (budget {self.cpu_budget:.0f}%), "
+                              f"system CPU {self.system_cpu:.0f}%")
+        elif relaxed and self.level > 0:
+            target = self.level - 1
+            reason = f"load eased: session CPU {self.process_cpu:.0f}%, system CPU {self.system_cpu:.0f}%"
+
+        if target == self.level:
+            return False
+
+        previous = self.level
+        self.level = target
+        self._last_change = now
+        stages = ", ".join(f"{name} {ms:.1f} ms" for name, ms in self.stage_ms.items())
+        details = f"{describe_level(target)}; {reason}"
+        if stages:
+            details += f"; {stages}"
+        direction = "reduced" if target > previous else "restored"
+        logging.warning(f"CPU governor {direction} detection quality: {details}")
+        if self.on_change:
+            self.on_change(direction, details)
+        return True
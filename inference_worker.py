@@ -0,0 +1,239 @@
+"""
+FaceMesh inference in a dedicated worker process.
+
+Moves colour conversion, FaceMesh and landmark analysis out of the main
+interpreter so they no longer compete for the GIL with camera capture, the
+audio listener and logging. Frames arrive through a shared-memory FrameRing;
+each result comes back over a pipe as one small float64 array:
+
+    [frame seq, frame timestamp, num_faces, iris_enabled,
+     lip_distance_0, gaze_code_0, lip_distance_1, gaze_code_1, ...,
+     landmark subset of face 0 (x, y, ...), landmark subset of face 1, ...]
+"""
+import time
+import logging
+import multiprocessing as mp
+
+import cv2
+import numpy as np
+
+from frame_ring import FrameRing
+from detection import MAX_FACES, LANDMARK_SUBSET, FrameBuffers, create_face_mesh, analyze_faces, landmark_subset
+
+HEADER_SIZE = 4
+FACES_SIZE = MAX_FACES * 2
+LANDMARKS_SIZE = MAX_FACES * len(LANDMARK_SUBSET) * 2
+RESULT_SIZE = HEADER_SIZE + FACES_SIZE + LANDMARKS_SIZE
+GAZE_MODES = ["contour", "landmarks"]
+
+
+def encode_result(out, seq, timestamp, multi_face_landmarks, faces, iris_enabled):
+    """Pack one FaceMesh result into a preallocated RESULT_SIZE float64 array"""
+    out[:] = 0
+    out[0] = seq
+    out[1] = timestamp
+    out[2] = len(multi_face_landmarks) if multi_face_landmarks else 0
+    out[3] = float(iris_enabled)
+    analysed = faces[:MAX_FACES].ravel()
+    out[HEADER_SIZE:HEADER_SIZE + len(analysed)] = analysed
+    points = landmark_subset(multi_face_landmarks).ravel()
+    start = HEADER_SIZE + FACES_SIZE
+    out[start:start + len(points)] = points
+    return out
+
+
+class InferenceResult:
+    """Decoded worker result"""
+
+    def __init__(self, buffer):
+        values = np.frombuffer(buffer, dtype=np.float64)
+        self.seq = int(values[0])
+        self.timestamp = float(values[1])
+        self.num_faces = int(values[2])
+        self.iris_enabled = bool(values[3])
+        # Only the first MAX_FACES faces are analysed
+        analysed = min(self.num_faces, MAX_FACES)
+        self.faces = values[HEADER_SIZE:HEADER_SIZE + analysed * 2].reshape(analysed, 2)
+        start = HEADER_SIZE + FACES_SIZE
+        points = len(LANDMARK_SUBSET)
+        self.landmarks = values[start:start + analysed * points * 2].reshape(analysed, points, 2)
+
+
+class InferenceWorker:
+    """Runs FaceMesh in a separate process fed through shared memory"""
+
+    def __init__(self, frame_shape, slots=2, static_image_mode=False, buffer_reuse=False):
+        self.frame_shape = tuple(frame_shape)
+        self.slots = slots
+        self.static_image_mode = static_image_mode
+        self.buffer_reuse = buffer_reuse
+        self.iris_enabled = False
+        self.frames_submitted = 0
+        self.frames_dropped = 0
+        self._pending = 0
+        self._ring = None
+        self._process = None
+        self._conn = None
+        self._stop = None
+        self._scale = None
+        self._gaze_mode = None
+
+    def start(self, timeout=30):
+        """Start the worker and wait for FaceMesh to initialise. Returns False on failure."""
+        ctx = mp.get_context("spawn")
+        self._ring = FrameRing(ctx, self.frame_shape, self.slots)
+        self._stop = ctx.Event()
+        self._scale = ctx.Value("d", 1.0)
+        self._gaze_mode = ctx.Value("i", 0)
+        self._conn, child_conn = ctx.Pipe(duplex=False)
+        self._process = ctx.Process(
+            target=_worker_main,
+            args=(self._ring.spec(), child_conn, self._stop, self._scale, self._gaze_mode,
+                  self.static_image_mode, self.buffer_reuse),
+            name="guard-ai-inference",
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+
+        try:
+            if not self._conn.poll(timeout):
+                logging.error("Inference worker did not start in time")
+                self.close()
+                return False
+            ready = np.frombuffer(self._conn.recv_bytes(), dtype=np.float64)
+        except (EOFError, OSError) as e:
+            logging.error(f"Inference worker exited during start-up: {e}")
+            self.close()
+            return False
+        if ready[0] < 0:
+            self.close()
+            return False
+        self.iris_enabled = bool(ready[1])
+        print(f"✅ Inference worker started (pid {self._process.pid})")
+        logging.info(f"Inference worker process started, pid {self._process.pid}")
+        return True
+
+    def is_alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    @property
+    def in_flight(self):
+        return self._ring.in_use() if self._ring is not None else 0
+
+    def set_quality(self, scale, gaze_mode):
+        """Apply CPU governor settings to frames submitted from now on"""
+        self._scale.value = scale
+        self._gaze_mode.value = GAZE_MODES.index(gaze_mode)
+
+    def submit(self, frame, timestamp=None):
+        """Copy a frame into shared memory. Returns False if the worker is saturated."""
+        self.frames_submitted += 1
+        if not self._ring.push(frame, time.time() if timestamp is None else timestamp):
+            self.frames_dropped += 1
+            return False
+        return True
+
+    def get_result(self, timeout=None):
+        """Wait for the next result; returns None on timeout"""
+        try:
+            if not self._conn.poll(timeout):
+                return None
+            return InferenceResult(self._conn.recv_bytes())
+        except (EOFError, OSError):
+            return None
+
+    def process(self, frame, timeout=5.0):
+        """Pipelined one frame deep: send this frame, return the previous frame's result.
+
+        Returns None while the pipeline fills (or the frame was dropped);
+        raises TimeoutError if the worker stops responding or has exited.
+        """
+        if self._process is not None and not self._process.is_alive():
+            # A dead worker never frees its ring slots, so submit would just keep dropping
+            raise TimeoutError(f"Inference worker exited (code {self._process.exitcode})")
+        if self.submit(frame):
+            self._pending += 1
+        if self._pending < 2:
+            return None
+        result = self.get_result(timeout=timeout)
+        if result is None:
+            raise TimeoutError("Inference worker stopped responding")
+        self._pending -= 1
+        return result
+
+    def close(self, timeout=5):
+        if self._process is not None:
+            self._stop.set()
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+            self._process = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+
+def start_worker(frame_shape, buffer_reuse=False, worker_class=InferenceWorker):
+    """Start an inference worker; None means fall back to in-process FaceMesh"""
+    worker = worker_class(frame_shape, buffer_reuse=buffer_reuse)
+    if worker.start():
+        return worker
+    print("⚠️ Warning: Inference worker failed, using in-process FaceMesh")
+    logging.warning("Inference worker failed to start, falling back to threaded mode")
+    return None
+
+
+def fall_back_to_face_mesh(worker, error, face_mesh_factory=create_face_mesh):
+    """Close a worker that failed mid-session and return in-process (face_mesh, iris_enabled)"""
+    print(f"⚠️ Warning: {error}, switching to in-process FaceMesh")
+    logging.error(f"Inference worker failed mid-session ({error}), falling back to threaded mode")
+    worker.close()
+    return face_mesh_factory()
+
+
+def _worker_main(ring_spec, conn, stop_event, scale, gaze_mode, static_image_mode=False, buffer_reuse=False):
+    """Worker process: FaceMesh + landmark analysis on frames from the ring"""
+    ring = FrameRing.attach(ring_spec)
+    face_mesh, iris_enabled = create_face_mesh(static_image_mode=static_image_mode)
+    if face_mesh is None:
+        conn.send_bytes(np.array([-1.0, 0.0]).tobytes())
+        ring.close()
+        return
+    conn.send_bytes(np.array([1.0, float(iris_enabled)]).tobytes())
+
+    seq = 0
+    out = np.zeros(RESULT_SIZE, dtype=np.float64)
+    # Ring frames all have the same shape, so the buffers can be sized up front
+    buffers = FrameBuffers(ring.frames[0].shape) if buffer_reuse else None
+    try:
+        while not stop_event.is_set():
+            item = ring.peek(timeout=0.1)
+            if item is None:
+                continue
+            slot, ts = item
+            frame = ring.frames[slot]
+            if buffers:
+                rgb_frame = buffers.to_rgb(frame, scale.value)
+            else:
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                if scale.value != 1.0:
+                    rgb_frame = cv2.resize(rgb_frame, None, fx=scale.value, fy=scale.value,
+                                           interpolation=cv2.INTER_AREA)
+            result = face_mesh.process(rgb_frame)
+            faces = analyze_faces(result.multi_face_landmarks, frame, iris_enabled, GAZE_MODES[gaze_mode.value],
+                                  buffers)
+            ring.release()
+
+            encode_result(out, seq, ts, result.multi_face_landmarks, faces, iris_enabled)
+            conn.send_bytes(out)
+            seq += 1
+    except (BrokenPipeError, EOFError):
+        pass
+    finally:
+        face_mesh.close()
+        ring.close()
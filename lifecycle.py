@@ -0,0 +1,311 @@
+"""
+Session lifecycle for the Flask server and the detection process.
+
+The detection process (main.py) publishes a heartbeat: a small JSON status
+file rewritten atomically every HEARTBEAT_INTERVAL seconds with its state
+and frame rates. States move through
+
+    starting -> running -> stopping -> report-ready
+                    (or failed, with an error message)
+
+The Flask side wraps the process in a SessionSupervisor. Start and stop
+return an operation ID at once; a monitor thread follows the heartbeat and
+the process and completes each operation. A stopping session is only
+killed if its heartbeat goes silent, so report generation is never cut off.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import signal
+import logging
+import threading
+import subprocess
+from collections import OrderedDict
+
+STARTING = "starting"
+RUNNING = "running"
+STOPPING = "stopping"
+REPORT_READY = "report-ready"
+FAILED = "failed"
+IDLE = "idle"
+
+MAX_OPERATIONS = 50
+
+
+def write_status(path, status):
+    """Replace the status file atomically so readers never see a partial write"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(status, f)
+    os.replace(tmp_path, path)
+
+
+def read_status(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class Heartbeat:
+    """Publishes the detection process's state and frame rates"""
+
+    def __init__(self, path, session_id, interval=1.0):
+        self.path = path
+        self.session_id = session_id
+        self.interval = interval
+        self.state = STARTING
+        self.error = None
+        self.report_path = None
+        # Incremented by the detection loop; plain ints are safe under the GIL
+        self.frames = 0
+        self.detections = 0
+        self.fps = 0.0
+        self.detection_fps = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._window = (time.time(), 0, 0)
+
+    def start(self):
+        self._publish()
+        self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+        self._thread.start()
+        return self
+
+    def set_state(self, state, error=None, report_path=None):
+        with self._lock:
+            # A failure stays visible even after the report has been written
+            if self.state == FAILED and state != FAILED:
+                self.report_path = report_path or self.report_path
+            else:
+                self.state = state
+                self.error = error or self.error
+                self.report_path = report_path or self.report_path
+        self._publish()
+
+    def _publish(self):
+        now = time.time()
+        with self._lock:
+            started, frames, detections = self._window
+            elapsed = now - started
+            if elapsed >= self.interval:
+                self.fps = (self.frames - frames) / elapsed
+                self.detection_fps = (self.detections - detections) / elapsed
+                self._window = (now, self.frames, self.detections)
+            status = {
+                "pid": os.getpid(),
+                "session_id": self.session_id,
+                "state": self.state,
+                "error": self.error,
+                "report_path": self.report_path,
+                "fps": round(self.fps, 1),
+                "detection_fps": round(self.detection_fps, 1),
+                "frames": self.frames,
+                "updated_at": now,
+            }
+        try:
+            write_status(self.path, status)
+        except OSError as e:
+            logging.warning(f"Heartbeat write failed: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._publish()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._publish()
+
+
+class SessionSupervisor:
+    """Starts and stops the detection process without blocking requests"""
+
+    def __init__(self, status_path, command, heartbeat_timeout=15.0, start_timeout=90.0,
+                 stop_timeout=300.0, poll_interval=0.5):
+        self.status_path = status_path
+        self.command = command
+        self.heartbeat_timeout = heartbeat_timeout
+        self.start_timeout = start_timeout
+        self.stop_timeout = stop_timeout
+        self.poll_interval = poll_interval
+        self.process = None
+        self.state = IDLE
+        self.error = None
+        self.operations = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop_requested_at = None
+        self._started_at = None
+        self._monitor = None
+
+    # --- Operations ---
+
+    def _new_operation(self, kind):
+        op_id = uuid.uuid4().hex[:12]
+        self.operations[op_id] = {
+            "id": op_id,
+            "type": kind,
+            "state": "in-progress",
+            "created_at": time.time(),
+            "finished_at": None,
+            "message": None,
+        }
+        while len(self.operations) > MAX_OPERATIONS:
+            self.operations.popitem(last=False)
+        return self.operations[op_id]
+
+    def _finish_operations(self, kind, succeeded, message=None):
+        for op in self.operations.values():
+            if op["type"] == kind and op["state"] == "in-progress":
+                op["state"] = "succeeded" if succeeded else "failed"
+                op["finished_at"] = time.time()
+                op["message"] = message
+
+    def get_operation(self, op_id):
+        with self._lock:
+            op = self.operations.get(op_id)
+            return dict(op) if op else None
+
+    def start(self):
+        """Launch the detection process. Returns (operation, error_message)."""
+        with self._lock:
+            if self.process is not None and self.process.poll() is None:
+                return None, ("Guard AI is stopping!" if self.state == STOPPING else "Guard AI is already running!")
+            # Never mistake the previous session's status for this one's
+            try:
+                os.remove(self.status_path)
+            except FileNotFoundError:
+                pass
+            self.process = subprocess.Popen(self.command, cwd=os.getcwd())
+            self.state = STARTING
+            self.error = None
+            self._started_at = time.time()
+            self._stop_requested_at = None
+            op = self._new_operation("start")
+            self._ensure_monitor()
+            logging.info(f"Guard AI process launched (pid {self.process.pid}), operation {op['id']}")
+            return dict(op), None
+
+    def stop(self):
+        """Ask the detection process to finish and write its report. Returns (operation, error_message)."""
+        with self._lock:
+            if self.process is None or self.process.poll() is not None:
+                return None, "Guard AI is not running!"
+            if self._stop_requested_at is None:
+                # SIGTERM lets main.py leave its loop and write the report
+                self.process.send_signal(signal.SIGTERM)
+                self._stop_requested_at = time.time()
+            if self.state != FAILED:
+                self.state = STOPPING
+            self._finish_operations("start", False, "Stopped before it was running")
+            op = self._new_operation("stop")
+            self._ensure_monitor()
+            return dict(op), None
+
+    # --- Status ---
+
+    def _heartbeat(self):
+        status = read_status(self.status_path)
+        if status is None or self.process is None or status.get("pid") != self.process.pid:
+            return None
+        return status
+
+    def status(self):
+        with self._lock:
+            heartbeat = self._heartbeat()
+            age = time.time() - heartbeat["updated_at"] if heartbeat else None
+            return {
+                "state": self.state,
+                "error": self.error,
+                "pid": self.process.pid if self.process is not None else None,
+                "session_id": heartbeat["session_id"] if heartbeat else None,
+                "fps": heartbeat["fps"] if heartbeat else 0.0,
+                "detection_fps": heartbeat["detection_fps"] if heartbeat else 0.0,
+                "heartbeat_age": round(age, 1) if age is not None else None,
+                "healthy": self.state not in (STARTING, RUNNING, STOPPING)
+                           or (age is not None and age < self.heartbeat_timeout),
+                "report_ready": heartbeat is not None and heartbeat.get("report_path") is not None,
+            }
+
+    # --- Monitor ---
+
+    def _ensure_monitor(self):
+        if self._monitor is None or not self._monitor.is_alive():
+            self._monitor = threading.Thread(target=self._run_monitor, name="session-monitor", daemon=True)
+            self._monitor.start()
+
+    def _run_monitor(self):
+        while True:
+            with self._lock:
+                if self.process is None:
+                    return
+                self._check()
+                if self.process.poll() is not None and self.state in (REPORT_READY, FAILED):
+                    return
+            time.sleep(self.poll_interval)
+
+    def _fail(self, message):
+        self.state = FAILED
+        self.error = message
+        self._finish_operations("start", False, message)
+        self._finish_operations("stop", False, message)
+        logging.error(f"Guard AI session failed: {message}")
+
+    def _check(self):
+        now = time.time()
+        heartbeat = self._heartbeat()
+        worker_state = heartbeat["state"] if heartbeat else None
+        age = now - heartbeat["updated_at"] if heartbeat else None
+        exit_code = self.process.poll()
+
+        if worker_state == FAILED:
+            if self.state != FAILED:
+                self._fail(heartbeat.get("error") or "Detection failed")
+        elif worker_state == REPORT_READY:
+            self.state = REPORT_READY
+            self._finish_operations("start", True)
+            self._finish_operations("stop", True, "Report ready")
+        elif exit_code is not None:
+            if self.state != FAILED:
+                self._fail(f"Guard AI exited with code {exit_code} before the report was ready")
+        elif worker_state in (RUNNING, STOPPING) and self.state == STARTING:
+            self.state = worker_state
+            self._finish_operations("start", True, "Camera opened, monitoring active")
+        elif worker_state == STOPPING:
+            self.state = STOPPING
+
+        if exit_code is not None:
+            return
+
+        # Only a silent worker is killed; a busy one keeps beating while it writes the report
+        last_sign_of_life = heartbeat["updated_at"] if heartbeat else self._started_at
+        silent = now - last_sign_of_life > self.heartbeat_timeout
+        if self._stop_requested_at is not None:
+            if silent or now - self._stop_requested_at > self.stop_timeout:
+                self._kill("stopped responding while stopping" if silent else "took too long to stop")
+        elif self.state == STARTING and now - self._started_at > self.start_timeout:
+            if heartbeat is None:
+                self._kill("did not start in time")
+            else:
+                # Alive but the camera never opened: stop it gracefully so it still writes a report
+                self.process.send_signal(signal.SIGTERM)
+                self._stop_requested_at = now
+                self._fail("Camera did not open in time")
+
+    def _kill(self, reason):
+        self.process.kill()
+        self.process.wait()
+        if self.state != FAILED:
+            self._fail(f"Guard AI {reason} and was killed")
+        logging.error(f"Guard AI process {reason} and was killed")
+
+
+def default_command():
+    """Python from the project venv if present, else the current interpreter"""
+    venv_python = os.path.join(os.getcwd(), "venv", "bin", "python")
+    return [venv_python if os.path.exists(venv_python) else sys.executable, "main.py"]
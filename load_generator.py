@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Synthetic load generator for Guard AI.
+
+Simulates many monitoring sessions at once without a camera or microphone.
+Every simulated event goes through the same paths as a real one: a line in
+the session report, a line in the rotating Guard AI log that /stream-logs
+follows, and at the end of each session the archived report is rendered and
+fetched from /download-report (then revalidated with If-None-Match).
+
+Load shape:
+    rate         mean events per second per session
+    mix          relative weight of each event type
+    burst        1 = evenly random arrivals (Poisson); B > 1 = events come in
+                 bursts at B x the rate separated by quiet gaps, same mean
+    sessions     simulated sessions running at once; each one ends after
+                 session_seconds and a new one takes its place
+
+Reported: achieved event throughput against the target, writer lag (event
+written vs when it was due), /stream-logs delivery lag, and download and
+revalidation latencies, each as p50/p95/p99/max.
+
+By default the Flask app is called in-process inside a scratch directory.
+With url=, requests go to a running server; run the generator from the
+server's directory so both use the same logs/. Simulated reports are
+archived as synthetic_report_*, which the session archive, archive
+retention and /download-report without ?session= all leave alone; only
+older synthetic reports are ever pruned.
+
+Usage: python load_generator.py [sessions=20] [rate=2] [burst=1] [duration=60]
+                                [session_seconds=30] [mix=Speaking:4,Looking Away:4,...]
+                                [url=http://localhost:5000] [workdir=DIR] [seed=N]
+"""
+import os
+import re
+import sys
+import time
+import uuid
+import random
+import logging
+import tempfile
+import itertools
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import config as cfg
+from log_rotation import setup_rotating_logger, archive_session_file, compressor
+from session_log import write_report_header, append_event
+from synthetic import EventSchedule, simulated_details
+
+EVENT_MARKER = re.compile(r"\(event (\d+)\)")
+# Archived as synthetic_report_<stamp>_<session>.txt next to, but apart from, real session reports
+SYNTHETIC_REPORT_NAME = "synthetic_report.txt"
+
+
+def parse_mix(text):
+    """'Speaking:4,Looking Away:1' -> {"Speaking": 4.0, "Looking Away": 1.0}"""
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.rpartition(":")
+        if not name:
+            raise ValueError(f"Expected <event type>:<weight>, got {item!r}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def percentiles(samples):
+    """p50/p95/p99/max in milliseconds"""
+    if not samples:
+        return {"count": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    values = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": len(values), "p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2), "max_ms": round(float(values.max()), 2)}
+
+
+class FlaskClient:
+    """Calls the Flask app in-process through its test client"""
+
+    def __init__(self):
+        from app import app
+        self._app = app
+
+    def get(self, path, headers=None):
+        response = self._app.test_client().get(path, headers=headers)
+        return response.status_code, response.headers.get("ETag"), len(response.data)
+
+    def stream_lines(self, path):
+        response = self._app.test_client().get(path, buffered=False)
+        for chunk in response.response:
+            text = chunk.decode("utf-8", "replace") if isinstance(chunk, bytes) else chunk
+            yield from text.splitlines()
+
+
+class HttpClient:
+    """Calls a running Guard AI server over HTTP"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def get(self, path, headers=None):
+        request = urllib.request.Request(self.base_url + path, headers=headers or {})
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, response.headers.get("ETag"), len(response.read())
+        except urllib.error.HTTPError as e:
+            # 304 Not Modified arrives as an HTTPError
+            return e.code, e.headers.get("ETag"), 0
+
+    def stream_lines(self, path):
+        with urllib.request.urlopen(self.base_url + path) as response:
+            for raw in response:
+                yield raw.decode("utf-8", "replace").rstrip("\n")
+
+
+class SimulatedSession:
+    """Session report of one simulated session"""
+
+    def __init__(self, slot, out_dir):
+        self.session_id = uuid.uuid4().hex[:8]
+        self.started_at = datetime.now()
+        self.out_dir = os.path.join(out_dir, f"session{slot}")
+        self.report_path = os.path.join(self.out_dir, SYNTHETIC_REPORT_NAME)
+        self.events = 0
+        os.makedirs(self.out_dir, exist_ok=True)
+        write_report_header(self.report_path, self.session_id, self.started_at, ["Simulated load"])
+
+
+class LoadGenerator:
+    """Runs N simulated sessions against the real logging, report and download paths"""
+
+    def __init__(self, client, sessions=20, rate=2.0, mix=None, burstiness=1.0, burst_seconds=2.0,
+                 session_seconds=30.0, out_dir="logs/load", seed=None):
+        self.client = client
+        self.sessions = sessions
+        self.rate = rate
+        mix = mix or {"Speaking": 1, "Looking Away": 1, "Multiple Persons": 1}
+        self.event_types = list(mix)
+        self.weights = [mix[t] for t in self.event_types]
+        self.burstiness = burstiness
+        self.burst_seconds = burst_seconds
+        self.session_seconds = session_seconds
+        self.out_dir = out_dir
+        self.seed = seed
+
+        self.events_written = 0
+        self.events_by_type = {t: 0 for t in self.event_types}
+        self.sessions_finished = 0
+        self.download_errors = 0
+        self.writer_lag = []
+        self.write_time = []
+        self.stream_lag = []
+        self.download_latency = []
+        self.revalidate_latency = []
+        self._written_at = {}
+        # Counters are updated from every session and finisher thread
+        self._counts_lock = threading.Lock()
+        self._seq = itertools.count()
+        self._stop = threading.Event()
+        self._ends_at = None
+        self._finisher = None
+
+    # --- Sessions ---
+
+    def _emit(self, session, rng, due):
+        event_type = rng.choices(self.event_types, self.weights)[0]
+        now = datetime.now()
+        clock = now.strftime("%H:%M:%S")
+        details = simulated_details(event_type, rng, now)
+        seq = next(self._seq)
+
+        started = time.perf_counter()
+        append_event(session.report_path, event_type, clock, details)
+        self._written_at[seq] = time.time()
+        logging.info(f"[{session.session_id}] {event_type} | {clock} | {details} (event {seq})")
+        self.write_time.append(time.perf_counter() - started)
+        self.writer_lag.append(time.time() - due)
+
+        session.events += 1
+        with self._counts_lock:
+            self.events_written += 1
+            self.events_by_type[event_type] += 1
+
+    def _run_slot(self, slot):
+        rng = random.Random(None if self.seed is None else self.seed + slot)
+        while not self._stop.is_set() and time.time() < self._ends_at:
+            session = SimulatedSession(slot, self.out_dir)
+            ends_at = min(time.time() + self.session_seconds, self._ends_at)
+            schedule = EventSchedule(self.rate, self.burstiness, self.burst_seconds, rng)
+            due = schedule.next()
+            while due < ends_at and not self._stop.wait(max(0.0, due - time.time())):
+                self._emit(session, rng, due)
+                due = schedule.next()
+            if self._stop.wait(max(0.0, ends_at - time.time())):
+                break
+            # Archive before the slot's next session reuses the report path, then
+            # render and download off the event path, like the real report step.
+            # Retention here only counts synthetic reports, and keeps two rounds of
+            # sessions so none is pruned before its download
+            archive_session_file(session.report_path, cfg.SESSION_ARCHIVE_DIRECTORY, session.session_id,
+                                 keep=max(cfg.SESSION_ARCHIVE_KEEP, 2 * self.sessions))
+            self._finisher.submit(self._finish, session)
+
+    def _finish(self, session):
+        path = f"/download-report?session={session.session_id}"
+        started = time.perf_counter()
+        status, etag, size = self.client.get(path)
+        self.download_latency.append(time.perf_counter() - started)
+        if status != 200 or not etag or not size:
+            with self._counts_lock:
+                self.download_errors += 1
+            logging.warning(f"Load generator: download of {session.session_id} returned {status}")
+            return
+        started = time.perf_counter()
+        status, _, _ = self.client.get(path, headers={"If-None-Match": etag})
+        self.revalidate_latency.append(time.perf_counter() - started)
+        with self._counts_lock:
+            if status != 304:
+                self.download_errors += 1
+            self.sessions_finished += 1
+
+    # --- /stream-logs ---
+
+    def _follow_stream(self):
+        try:
+            for line in self.client.stream_lines("/stream-logs"):
+                match = EVENT_MARKER.search(line)
+                if not match:
+                    continue
+                written_at = self._written_at.pop(int(match.group(1)), None)
+                if written_at is not None:
+                    self.stream_lag.append(time.time() - written_at)
+        except Exception as e:
+            if not self._stop.is_set():
+                logging.error(f"Load generator: /stream-logs failed: {e}")
+
+    # --- Run ---
+
+    def run(self, duration):
+        """Generate load for duration seconds, wait for the last downloads and return stats"""
+        os.makedirs(self.out_dir, exist_ok=True)
+        threading.Thread(target=self._follow_stream, name="load-stream-logs", daemon=True).start()
+        # /stream-logs starts at the end of the log; give it a moment to open the file
+        time.sleep(1.0)
+
+        self._finisher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="load-report")
+        started = time.time()
+        self._ends_at = started + duration
+        slots = [threading.Thread(target=self._run_slot, args=(n,), name=f"load-session{n}", daemon=True)
+                 for n in range(self.sessions)]
+        for thread in slots:
+            thread.start()
+        for thread in slots:
+            thread.join()
+        elapsed = time.time() - started
+        self._finisher.shutdown(wait=True)
+        # Allow /stream-logs one more poll to deliver the last lines
+        deadline = time.time() + 2.0
+        while self._written_at and time.time() < deadline:
+            time.sleep(0.1)
+        self._stop.set()
+        return self.stats(elapsed)
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self, elapsed):
+        return {
+            "sessions": self.sessions,
+            "elapsed": round(elapsed, 1),
+            "target_events_per_sec": self.sessions * self.rate,
+            "events_per_sec": round(self.events_written / elapsed, 1) if elapsed > 0 else 0.0,
+            "events_written": self.events_written,
+            "events_by_type": dict(self.events_by_type),
+            "stream_lines_missed": len(self._written_at),
+            "sessions_finished": self.sessions_finished,
+            "download_errors": self.download_errors,
+            "writer_lag": percentiles(self.writer_lag),
+            "write_time": percentiles(self.write_time),
+            "stream_lag": percentiles(self.stream_lag),
+            "download": percentiles(self.download_latency),
+            "revalidate": percentiles(self.revalidate_latency),
+        }
+
+
+def print_stats(stats):
+    print(f"\nSessions: {stats['sessions']} at once, {stats['sessions_finished']} finished "
+          f"and downloaded ({stats['download_errors']} errors)")
+    print(f"Events: {stats['events_written']} in {stats['elapsed']}s = {stats['events_per_sec']}/s "
+          f"(target {stats['target_events_per_sec']:.1f}/s)")
+    print("  " + ", ".join(f"{name}: {count}" for name, count in stats["events_by_type"].items()))
+    print(f"/stream-logs: {stats['stream_lines_missed']} event lines not delivered\n")
+    print(f"{'Latency':<26} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    rows = [("Writer lag (due→written)", "writer_lag"), ("Event write", "write_time"),
+            ("/stream-logs delivery", "stream_lag"), ("Download (render + send)", "download"),
+            ("Revalidate (304)", "revalidate")]
+    for label, key in rows:
+        s = stats[key]
+        if not s["count"]:
+            print(f"{label:<26} {0:>7}")
+            continue
+        print(f"{label:<26} {s['count']:>7} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} "
+              f"{s['p99_ms']:>9.1f} {s['max_ms']:>9.1f}")
+
+
+def main():
+    options = {
+        "sessions": str(cfg.LOAD_SESSIONS),
+        "rate": str(cfg.LOAD_EVENT_RATE),
+        "burst": str(cfg.LOAD_BURSTINESS),
+        "burst_seconds": str(cfg.LOAD_BURST_SECONDS),
+        "duration": str(cfg.LOAD_DURATION),
+        "session_seconds": str(cfg.LOAD_SESSION_SECONDS),
+        "mix": None,
+        "url": None,
+        "workdir": None,
+        "seed": None,
+    }
+    for arg in sys.argv[1:]:
+        key, _, value = arg.partition("=")
+        if key not in options or not value:
+            print(__doc__.split("Usage:")[1].strip())
+            sys.exit(1)
+        options[key] = value
+    mix = parse_mix(options["mix"]) if options["mix"] else cfg.LOAD_EVENT_MIX
+
+    if options["url"]:
+        client = HttpClient(options["url"])
+    else:
+        # Keep synthetic sessions out of the real logs and archive
+        workdir = options["workdir"] or tempfile.mkdtemp(prefix="guard_ai_load_")
+        os.makedirs(workdir, exist_ok=True)
+        os.chdir(workdir)
+        print(f"Working directory: {workdir}")
+    os.makedirs("logs", exist_ok=True)
+    setup_rotating_logger(
+        logging.getLogger(), "logs/guard_ai_logs.txt", "%(asctime)s - %(message)s",
+        int(cfg.LOG_MAX_MB * 1024 * 1024), cfg.LOG_BACKUP_COUNT, int(cfg.LOG_MAX_TOTAL_MB * 1024 * 1024)
+    )
+    if not options["url"]:
+        client = FlaskClient()
+
+    generator = LoadGenerator(
+        client,
+        sessions=int(options["sessions"]),
+        rate=float(options["rate"]),
+        mix=mix,
+        burstiness=float(options["burst"]),
+        burst_seconds=float(options["burst_seconds"]),
+        session_seconds=float(options["session_seconds"]),
+        out_dir=os.path.join("logs", "load"),
+        seed=int(options["seed"]) if options["seed"] else None
+    )
+    print(f"Generating load: {generator.sessions} sessions x {generator.rate} events/s "
+          f"(burstiness {generator.burstiness}) for {options['duration']}s...")
+    try:
+        stats = generator.run(float(options["duration"]))
+    except KeyboardInterrupt:
+        generator.stop()
+        print("\nStopped.")
+        return
+    print_stats(stats)
+    compressor.wait()
+
+
+if __name__ == "__main__":
+    main()
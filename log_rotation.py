@@ -0,0 +1,256 @@
+"""
+Size- and session-based log rotation for Guard AI.
+
+Rotated segments get a timestamped name and are gzip-compressed on a
+background thread, so a rollover only costs the logging thread a rename.
+A retention policy caps both the number of segments and their total size.
+follow_file() tails a log across rotations for the /stream-logs endpoint.
+"""
+import os
+import re
+import glob
+import gzip
+import time
+import shutil
+import logging
+import threading
+from queue import Queue
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+
+class _Compressor:
+    """Single background thread that gzips rotated segments in order"""
+
+    def __init__(self):
+        self._queue = Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, path, on_done=None):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-compressor", daemon=True)
+                self._thread.start()
+        self._queue.put((path, on_done))
+
+    def wait(self):
+        """Block until every submitted segment has been compressed"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            path, on_done = self._queue.get()
+            try:
+                compress_file(path)
+                if on_done:
+                    on_done()
+            except Exception as e:
+                # Never let a logging side job raise into the application
+                print(f"⚠️ Warning: Log compression failed for {path}: {e}")
+            finally:
+                self._queue.task_done()
+
+
+compressor = _Compressor()
+
+
+def compress_file(path):
+    """gzip a file next to itself and remove the original"""
+    tmp_path = path + ".gz.tmp"
+    with open(path, "rb") as src, open(tmp_path, "wb") as raw, \
+            gzip.GzipFile(os.path.basename(path), "wb", 6, raw) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp_path, path + ".gz")
+    os.remove(path)
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler with timestamped, background-compressed segments.
+
+    Segments are named <file>.<YYYYmmdd-HHMMSS-ffffff>[.gz]. Retention keeps at
+    most backup_count segments and max_total_bytes of them on disk.
+    """
+
+    def __init__(self, filename, max_bytes=5 * 1024 * 1024, backup_count=20,
+                 max_total_bytes=100 * 1024 * 1024, encoding="utf-8"):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        super().__init__(filename, mode="a", maxBytes=max_bytes, backupCount=backup_count,
+                         encoding=encoding, delay=False)
+        self.max_total_bytes = max_total_bytes
+        self.rollovers = 0
+        self.rollover_seconds = 0.0
+
+        # Finish compressing segments left behind by an interrupted run
+        for stale in glob.glob(self.baseFilename + ".*.gz.tmp"):
+            os.remove(stale)
+        for segment in self.segments():
+            if not segment.endswith(".gz"):
+                compressor.submit(segment, on_done=self.apply_retention)
+
+    def segments(self):
+        return list_segments(self.baseFilename)
+
+    def doRollover(self):
+        start = time.perf_counter()
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            segment = f"{self.baseFilename}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+            os.rename(self.baseFilename, segment)
+            compressor.submit(segment, on_done=self.apply_retention)
+        self.stream = self._open()
+        self.rollovers += 1
+        self.rollover_seconds += time.perf_counter() - start
+
+    def rotate_for_session(self):
+        """Start a fresh file for a new session"""
+        self.acquire()
+        try:
+            self.doRollover()
+        finally:
+            self.release()
+
+    def apply_retention(self):
+        apply_retention(self.baseFilename, self.backupCount, self.max_total_bytes)
+
+
+def list_segments(base_path):
+    """Rotated segments of a log file, oldest first"""
+    pattern = re.compile(re.escape(os.path.basename(base_path)) + r"\.\d{8}-\d{6}-\d{6}(\.gz)?$")
+    found = [p for p in glob.glob(base_path + ".*") if pattern.match(os.path.basename(p))]
+    return sorted(found)
+
+
+def apply_retention(base_path, max_segments, max_total_bytes):
+    """Delete the oldest segments until both limits are met"""
+    segments = list_segments(base_path)
+    sizes = {}
+    for path in segments:
+        try:
+            sizes[path] = os.path.getsize(path)
+        except OSError:
+            sizes[path] = 0
+    total = sum(sizes.values())
+    while segments and (len(segments) > max_segments or total > max_total_bytes):
+        oldest = segments.pop(0)
+        total -= sizes[oldest]
+        try:
+            os.remove(oldest)
+        except OSError:
+            pass
+
+
+def archive_session_file(path, archive_dir, session_id, keep=50, move=True):
+    """Move (or copy) a finished session file into the archive and compress it in the background.
+
+    Returns the archived path (before compression), or None if there was
+    nothing to keep or this session is already archived.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    os.makedirs(archive_dir, exist_ok=True)
+    name, ext = os.path.splitext(os.path.basename(path))
+    existing = glob.glob(os.path.join(archive_dir, f"{name}_*_{session_id}{ext}*"))
+    if any(not old.endswith(".part") for old in existing):
+        return None
+    stamp = datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y%m%d-%H%M%S")
+    archived = os.path.join(archive_dir, f"{name}_{stamp}_{session_id}{ext}")
+    if move:
+        os.replace(path, archived)
+    else:
+        # Copy under a name the archive ingestor and report lookups ignore,
+        # so a half-copied report is never picked up
+        tmp_path = archived + ".part"
+        shutil.copy2(path, tmp_path)
+        os.replace(tmp_path, archived)
+
+    def prune():
+        archives = sorted(old for old in glob.glob(os.path.join(archive_dir, f"{name}_*"))
+                          if not old.endswith(".part"))
+        for old in archives[:-keep] if keep else []:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    compressor.submit(archived, on_done=prune)
+    return archived
+
+
+def read_session_id(report_path):
+    """Session ID from a session report header, or 'unknown'"""
+    try:
+        with open(report_path, "r", encoding="utf-8") as f:
+            first = f.readline()
+    except OSError:
+        return "unknown"
+    match = re.search(r"Session Report - (\w+)", first)
+    return match.group(1) if match else "unknown"
+
+
+def follow_file(path, poll_interval=0.5, from_end=True, should_stop=None):
+    """Yield lines appended to a log file, surviving rotation and truncation.
+
+    Reopens the path whenever it is replaced by a new file (different inode)
+    or shrinks below the current read position.
+    """
+    f = None
+    inode = None
+    partial = ""
+    # A file that does not exist yet is read from its first line once it appears
+    first_open = os.path.exists(path)
+    try:
+        while should_stop is None or not should_stop():
+            if f is None:
+                try:
+                    f = open(path, "r", encoding="utf-8", errors="replace")
+                except FileNotFoundError:
+                    time.sleep(poll_interval)
+                    continue
+                inode = os.fstat(f.fileno()).st_ino
+                if first_open and from_end:
+                    f.seek(0, 2)
+                first_open = False
+
+            line = f.readline()
+            if line:
+                # Hold back a line the writer has not finished yet
+                if not line.endswith("\n"):
+                    partial += line
+                    time.sleep(poll_interval)
+                    continue
+                yield partial + line
+                partial = ""
+                continue
+
+            try:
+                st = os.stat(path)
+                rotated = st.st_ino != inode or st.st_size < f.tell()
+            except FileNotFoundError:
+                rotated = True
+            if rotated:
+                # Drain anything written to the old file before it was rotated
+                rest = partial + f.read()
+                partial = ""
+                for line in rest.splitlines(keepends=True):
+                    yield line
+                f.close()
+                f = None
+                continue
+            time.sleep(poll_interval)
+    finally:
+        if f is not None:
+            f.close()
+
+
+def setup_rotating_logger(logger, path, fmt, max_bytes, backup_count, max_total_bytes,
+                          level=logging.INFO, datefmt=None):
+    """Attach a CompressingRotatingFileHandler to a logger and return the handler"""
+    handler = CompressingRotatingFileHandler(path, max_bytes=max_bytes, backup_count=backup_count,
+                                             max_total_bytes=max_total_bytes)
+    handler.setFormatter(logging.Formatter(fmt, datefmt=datefmt))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return handler
@@ -1,7 +1,7 @@
 import threading
 import queue
+from collections import deque
 import cv2
-import mediapipe as mp
 import numpy as np
 import sounddevice as sd
 import psutil
@@ -10,32 +10,55 @@ import time
 import subprocess
 from datetime import datetime
 import logging
-from fpdf import FPDF
 import textwrap
 import uuid
 import signal
 import sys
 import random
+import multiprocessing
+import shutil
 import config as cfg
+from evidence import EvidenceBuffer
+from recorder import SessionRecorder
+from inference_worker import start_worker, fall_back_to_face_mesh
+from detection import GAZE_DIRECTIONS, FrameBuffers, create_face_mesh, analyze_faces, landmark_subset
+from governor import CpuGovernor
+from log_rotation import setup_rotating_logger, archive_session_file, read_session_id, compressor
+from report import create_pdf_report, REPORT_SETTINGS
+from session_log import write_report_header, append_event
+from report_cache import ReportCache
+from timeline import TimelineRecorder
+from synthetic import EventSchedule, simulated_details
+from lifecycle import Heartbeat, STARTING, RUNNING, STOPPING, REPORT_READY, FAILED
 
 # Generate unique session ID
 SESSION_ID = str(uuid.uuid4())[:8]
 
-# Logging setup
-os.makedirs("logs", exist_ok=True)
-logging.basicConfig(
-    filename="logs/guard_ai_logs.txt", 
-    level=logging.INFO, 
-    format=f"[{SESSION_ID}] %(asctime)s - %(message)s"
-)
-
 # Paths
 log_file_path = "website_usage_logs.txt"
 session_report_path = "logs/session_report.txt"
 
+# Logging setup (size-capped, rotated per session, compressed in the background)
+os.makedirs("logs", exist_ok=True)
+website_logger = logging.getLogger("guard_ai.website")
+website_logger.propagate = False
+log_handler = None
+website_log_handler = None
+if multiprocessing.parent_process() is None:
+    # Only the main process owns (and rotates) the log files; spawned
+    # workers re-import this module and must not touch them
+    log_max_bytes = int(cfg.LOG_MAX_MB * 1024 * 1024)
+    log_max_total = int(cfg.LOG_MAX_TOTAL_MB * 1024 * 1024)
+    log_handler = setup_rotating_logger(
+        logging.getLogger(), "logs/guard_ai_logs.txt", f"[{SESSION_ID}] %(asctime)s - %(message)s",
+        log_max_bytes, cfg.LOG_BACKUP_COUNT, log_max_total
+    )
+    website_log_handler = setup_rotating_logger(
+        website_logger, log_file_path, f"[{SESSION_ID}] [%(asctime)s] %(message)s",
+        log_max_bytes, cfg.LOG_BACKUP_COUNT, log_max_total, datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
 # Lip Detection Constants (from config)
-UPPER_LIP = [13, 14]
-LOWER_LIP = [17, 18]
 LIP_MOVEMENT_THRESHOLD = cfg.LIP_MOVEMENT_THRESHOLD
 SPEAKING_AUDIO_THRESHOLD = cfg.SPEAKING_AUDIO_THRESHOLD
 BACKGROUND_NOISE_THRESHOLD = cfg.BACKGROUND_NOISE_THRESHOLD
@@ -44,20 +67,20 @@ FS = cfg.AUDIO_SAMPLE_RATE
 MINIMUM_SPEAKING_DURATION = cfg.MINIMUM_SPEAKING_DURATION
 
 # Gaze Tracking Constants (from config)
-LEFT_EYE = [362, 385, 387, 263, 373, 380]
-RIGHT_EYE = [33, 160, 158, 133, 153, 144]
-LEFT_IRIS = [474, 475, 476, 477]
-RIGHT_IRIS = [469, 470, 471, 472]
 LOOK_AWAY_DURATION = cfg.LOOK_AWAY_DURATION
 MINIMUM_LOOK_AWAY_DURATION = cfg.MINIMUM_LOOK_AWAY_DURATION
 
 # Global Variables
 audio_detected = False
+audio_level = 0.0
 background_noise_detected = False
-frame_queue = queue.Queue()
+# Bounded: when the display falls behind, frames are skipped rather than queued
+frame_queue = queue.Queue(maxsize=2)
 multiple_persons_detected = False
 session_start_time = datetime.now()
 is_running = True
+stop_event = threading.Event()  # Wakes the website and demo threads at shutdown
+heartbeat = None
 
 def signal_handler(sig, frame):
     global is_running
@@ -69,32 +92,53 @@ def signal_handler(sig, frame):
 signal.signal(signal.SIGTERM, signal_handler)
 signal.signal(signal.SIGINT, signal_handler)
 
-# Clear session report at startup for fresh session
+# Start a fresh session report, archiving the previous session's one
+# (if it ended without archiving itself, e.g. after a crash)
 def clear_session_report():
     if os.path.exists(session_report_path):
-        with open(session_report_path, 'w') as f:
-            f.write(f"# Guard AI Session Report - {SESSION_ID}\n")
-            f.write(f"# Session Started: {session_start_time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        logging.info("Session report cleared for new session")
+        previous_id = read_session_id(session_report_path)
+        archived = archive_session_file(session_report_path, cfg.SESSION_ARCHIVE_DIRECTORY,
+                                        previous_id, keep=cfg.SESSION_ARCHIVE_KEEP)
+        if archived:
+            logging.info(f"Previous session report archived to {archived}")
     else:
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(session_report_path), exist_ok=True)
-        with open(session_report_path, 'w') as f:
-            f.write(f"# Guard AI Session Report - {SESSION_ID}\n")
-            f.write(f"# Session Started: {session_start_time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-
-clear_session_report()
+    write_report_header(session_report_path, SESSION_ID, session_start_time)
 
 # Helper Functions
 def log_event(message):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(log_file_path, "a") as f:
-        f.write(f"[{SESSION_ID}] [{timestamp}] {message}\n")
+    website_logger.info(message)
     logging.info(message)
 
-def log_session_event(event_type, start_time, details):
-    with open(session_report_path, "a") as f:
-        f.write(f"{event_type} | {start_time} | {details}\n")
+def log_session_event(event_type, start_time, details, clip=None):
+    append_event(session_report_path, event_type, start_time, details, clip)
+
+def log_quality_change(change, details):
+    log_session_event("Detection Quality", datetime.now().strftime("%H:%M:%S"), f"{change.capitalize()}: {details}")
+
+def draw_status(frame, status, direction, num_faces, warning):
+    cv2.putText(frame, f"Lip Status: {status}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+    cv2.putText(frame, f"Gaze Direction: {direction}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
+    cv2.putText(frame, f"Faces Detected: {num_faces}", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+    if warning:
+        cv2.putText(frame, warning, (10, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+
+def queue_display_frame(frame, display_frames):
+    """Hand a frame to the display loop.
+
+    With buffer reuse the frame is overwritten by the next capture, so it is
+    copied into the next of the preallocated display_frames (one more than
+    the queue can hold plus the frame on screen, so none is in use).
+    """
+    if frame_queue.full():
+        return
+    if display_frames:
+        slot = display_frames[0]
+        display_frames.rotate(-1)
+        np.copyto(slot, frame)
+        frame = slot
+    frame_queue.put(frame)
 
 def is_safari_open():
     for proc in psutil.process_iter(['pid', 'name']):
@@ -124,208 +168,9 @@ def get_safari_tabs():
         log_event(f"Error running AppleScript: {e}")
         return []
 
-def create_pdf_report(txt_path, pdf_path):
-    """Generate a professional PDF report from session data"""
-    pdf = FPDF()
-    pdf.add_page()
-    
-    # Title
-    pdf.set_font("Arial", 'B', size=20)
-    pdf.set_text_color(0, 51, 102)  # Dark blue
-    pdf.cell(0, 15, "Guard AI - Proctoring Report", ln=True, align='C')
-    pdf.ln(3)
-    
-    # Session Info Box
-    pdf.set_fill_color(240, 240, 240)  # Light gray background
-    pdf.set_font("Arial", 'B', size=10)
-    pdf.set_text_color(0, 0, 0)
-    pdf.cell(0, 8, "Session Information", ln=True, fill=True)
-    pdf.set_font("Arial", size=9)
-    pdf.cell(0, 6, f"Session ID: {SESSION_ID}", ln=True)
-    pdf.cell(0, 6, f"Session Start: {session_start_time.strftime('%Y-%m-%d %H:%M:%S')}", ln=True)
-    pdf.cell(0, 6, f"Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True)
-    pdf.ln(8)
-
-    # Parse events from log file
-    website_events = []
-    speaking_events = []
-    looking_events = []
-    multiple_person_events = []
-
-    try:
-        with open(txt_path, "r", encoding="utf-8") as file:
-            for line in file:
-                line = line.strip()
-                if not line:
-                    continue
-
-                # Parse different log formats
-                if line.startswith("Website Activity"):
-                    parts = line.split("|")
-                    if len(parts) >= 2:
-                        time_part = parts[1].strip()
-                        details = parts[2].strip() if len(parts) > 2 else "N/A"
-                        website_events.append({"time": time_part, "details": details})
-                        
-                elif line.startswith("Speaking"):
-                    parts = line.split("|")
-                    if len(parts) >= 3:
-                        start = parts[1].strip()
-                        end = parts[2].strip()
-                        speaking_events.append({"start": start, "end": end})
-                        
-                elif line.startswith("Looking Away"):
-                    parts = line.split("|")
-                    if len(parts) >= 3:
-                        start = parts[1].strip()
-                        end = parts[2].strip()
-                        looking_events.append({"start": start, "end": end})
-                        
-                elif line.startswith("Multiple Persons"):
-                    parts = line.split("|")
-                    if len(parts) >= 2:
-                        time_part = parts[1].strip()
-                        details = parts[2].strip() if len(parts) > 2 else "N/A"
-                        multiple_person_events.append({"time": time_part, "details": details})
-
-        # Summary Statistics
-        pdf.set_font("Arial", 'B', size=14)
-        pdf.set_text_color(0, 51, 102)
-        pdf.cell(0, 10, "Summary Statistics", ln=True)
-        pdf.set_text_color(0, 0, 0)
-        pdf.set_font("Arial", size=10)
-        
-        pdf.cell(95, 7, f"Total Speaking Incidents: {len(speaking_events)}", border=1)
-        pdf.cell(95, 7, f"Total Looking Away Incidents: {len(looking_events)}", border=1, ln=True)
-        pdf.cell(95, 7, f"Total Website Checks: {len(website_events)}", border=1)
-        pdf.cell(95, 7, f"Multiple Person Detections: {len(multiple_person_events)}", border=1, ln=True)
-        pdf.ln(10)
-
-        # Section: Speaking Events
-        pdf.set_font("Arial", 'B', 14)
-        pdf.set_text_color(0, 51, 102)
-        pdf.cell(0, 10, "Speaking Events", ln=True)
-        pdf.set_text_color(0, 0, 0)
-        pdf.set_font("Arial", size=9)
-        
-        if speaking_events:
-            # Show only first 50 events to avoid huge PDFs
-            display_events = speaking_events[:50]
-            pdf.set_font("Arial", 'B', size=9)
-            pdf.cell(20, 6, "No.", border=1, align='C')
-            pdf.cell(85, 6, "Start Time", border=1, align='C')
-            pdf.cell(85, 6, "End Time", border=1, align='C', ln=True)
-            pdf.set_font("Arial", size=8)
-            
-            for idx, event in enumerate(display_events, 1):
-                pdf.cell(20, 6, str(idx), border=1, align='C')
-                pdf.cell(85, 6, event['start'], border=1)
-                pdf.cell(85, 6, event['end'], border=1, ln=True)
-            
-            if len(speaking_events) > 50:
-                pdf.set_font("Arial", 'I', size=8)
-                pdf.cell(0, 6, f"... and {len(speaking_events) - 50} more events (showing first 50)", ln=True)
-        else:
-            pdf.cell(0, 7, "No speaking events detected.", ln=True)
-        
-        pdf.ln(8)
-
-        # Section: Looking Away Events
-        pdf.set_font("Arial", 'B', 14)
-        pdf.set_text_color(0, 51, 102)
-        pdf.cell(0, 10, "Looking Away Events", ln=True)
-        pdf.set_text_color(0, 0, 0)
-        pdf.set_font("Arial", size=9)
-        
-        if looking_events:
-            display_events = looking_events[:50]
-            pdf.set_font("Arial", 'B', size=9)
-            pdf.cell(20, 6, "No.", border=1, align='C')
-            pdf.cell(85, 6, "Start Time", border=1, align='C')
-            pdf.cell(85, 6, "End Time", border=1, align='C', ln=True)
-            pdf.set_font("Arial", size=8)
-            
-            for idx, event in enumerate(display_events, 1):
-                pdf.cell(20, 6, str(idx), border=1, align='C')
-                pdf.cell(85, 6, event['start'], border=1)
-                pdf.cell(85, 6, event['end'], border=1, ln=True)
-            
-            if len(looking_events) > 50:
-                pdf.set_font("Arial", 'I', size=8)
-                pdf.cell(0, 6, f"... and {len(looking_events) - 50} more events (showing first 50)", ln=True)
-        else:
-            pdf.cell(0, 7, "No looking away events detected.", ln=True)
-        
-        pdf.ln(8)
-
-        # Section: Multiple Person Detection
-        pdf.set_font("Arial", 'B', 14)
-        pdf.set_text_color(0, 51, 102)
-        pdf.cell(0, 10, "Multiple Person Detection", ln=True)
-        pdf.set_text_color(0, 0, 0)
-        pdf.set_font("Arial", size=9)
-        
-        if multiple_person_events:
-            pdf.set_font("Arial", 'B', size=9)
-            pdf.cell(20, 6, "No.", border=1, align='C')
-            pdf.cell(60, 6, "Time", border=1, align='C')
-            pdf.cell(110, 6, "Details", border=1, align='C', ln=True)
-            pdf.set_font("Arial", size=8)
-            
-            for idx, event in enumerate(multiple_person_events, 1):
-                pdf.cell(20, 6, str(idx), border=1, align='C')
-                pdf.cell(60, 6, event['time'], border=1)
-                pdf.cell(110, 6, event['details'][:50], border=1, ln=True)
-        else:
-            pdf.cell(0, 7, "No multiple person incidents detected.", ln=True)
-        
-        pdf.ln(8)
-
-        # Section: Website Activity (show last 20)
-        pdf.set_font("Arial", 'B', 14)
-        pdf.set_text_color(0, 51, 102)
-        pdf.cell(0, 10, "Website Activity (Last 20 Checks)", ln=True)
-        pdf.set_text_color(0, 0, 0)
-        pdf.set_font("Arial", size=9)
-        
-        if website_events:
-            display_events = website_events[-20:]  # Show last 20
-            pdf.set_font("Arial", 'B', size=9)
-            pdf.cell(40, 6, "Time", border=1, align='C')
-            pdf.cell(150, 6, "Websites/Tabs", border=1, align='C', ln=True)
-            pdf.set_font("Arial", size=7)
-            
-            for event in display_events:
-                pdf.cell(40, 6, event['time'][:15], border=1)
-                # Truncate long tab names
-                tabs = event['details'][:80] + "..." if len(event['details']) > 80 else event['details']
-                pdf.cell(150, 6, tabs, border=1, ln=True)
-        else:
-            pdf.cell(0, 7, "No website activity recorded.", ln=True)
-
-        # Footer
-        pdf.ln(10)
-        pdf.set_font("Arial", 'I', size=8)
-        pdf.set_text_color(128, 128, 128)
-        pdf.cell(0, 5, "This report was automatically generated by Guard AI Proctoring System", ln=True, align='C')
-        pdf.cell(0, 5, f"For questions or concerns, please contact your exam administrator", ln=True, align='C')
-
-        pdf.output(pdf_path)
-        print(f"✅ Final report saved to {pdf_path}")
-        logging.info(f"PDF report generated successfully: {pdf_path}")
-
-    except Exception as e:
-        print(f"❌ PDF creation error: {e}")
-        logging.error(f"PDF generation failed: {e}")
-
-# Lip Detection
-def get_lip_distance(landmarks, upper_lip_idx, lower_lip_idx, frame_w, frame_h):
-    upper_lip_points = np.array([(landmarks[i].x * frame_w, landmarks[i].y * frame_h) for i in upper_lip_idx])
-    lower_lip_points = np.array([(landmarks[i].x * frame_w, landmarks[i].y * frame_h) for i in lower_lip_idx])
-    return np.linalg.norm(np.mean(upper_lip_points, axis=0) - np.mean(lower_lip_points, axis=0))
 
 def audio_listener():
-    global audio_detected, background_noise_detected
+    global audio_detected, audio_level, background_noise_detected
     print("[Audio Listener] Started")
     logging.info("Audio listener thread started")
     
@@ -345,6 +190,7 @@ def audio_listener():
             audio_data = sd.rec(int(AUDIO_DURATION * FS), samplerate=FS, channels=1, dtype='float64')
             sd.wait()
             volume_norm = np.linalg.norm(audio_data) * 10
+            audio_level = volume_norm
             audio_detected = volume_norm > SPEAKING_AUDIO_THRESHOLD
             background_noise_detected = volume_norm > BACKGROUND_NOISE_THRESHOLD
         except Exception as e:
@@ -353,75 +199,21 @@ def audio_listener():
                 logging.error(f"Audio error: {e}")
             time.sleep(0.5)
 
-# Gaze Tracking
-def get_iris_position(landmarks, eye_landmarks, iris_landmarks, frame):
-    h, w, _ = frame.shape
-    eye_points = np.array([(int(landmarks[i].x * w), int(landmarks[i].y * h)) for i in eye_landmarks])
-    iris_points = np.array([(int(landmarks[i].x * w), int(landmarks[i].y * h)) for i in iris_landmarks])
-    x_min, y_min = np.min(eye_points, axis=0)
-    x_max, y_max = np.max(eye_points, axis=0)
-
-    eye_region = frame[y_min:y_max, x_min:x_max]
-    gray_eye = cv2.cvtColor(eye_region, cv2.COLOR_BGR2GRAY)
-    _, threshold_eye = cv2.threshold(gray_eye, 50, 255, cv2.THRESH_BINARY_INV)
-
-    contours, _ = cv2.findContours(threshold_eye, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-    if contours:
-        contour = max(contours, key=cv2.contourArea)
-        (x, y, w_eye, h_eye) = cv2.boundingRect(contour)
-        cx = x + w_eye // 2
-        cy = y + h_eye // 2
-        if cx < eye_region.shape[1] // 3:
-            return "Looking Left"
-        elif cx > 2 * eye_region.shape[1] // 3:
-            return "Looking Right"
-        elif cy < eye_region.shape[0] // 3:
-            return "Looking Up"
-        elif cy > 2 * eye_region.shape[0] // 3:
-            return "Looking Down"
-        else:
-            return "Looking Center"
-    return "Looking Center"
-
 # Combined Detection
 def run_combined_detection():
     global multiple_persons_detected
     print(f"[Combined Detection] Started - Session ID: {SESSION_ID}")
     logging.info(f"Starting Guard AI monitoring session")
     
+    face_mesh = None
     iris_tracking_enabled = False
-    
-    try:
-        # Try initializing with refine_landmarks=True for Iris Tracking
-        face_mesh = mp.solutions.face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=2,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        iris_tracking_enabled = True
-        print("✅ Face Mesh initialized successfully (Iris Tracking Enabled)")
-        logging.info("Face Mesh initialized with Iris Tracking")
-    except Exception as e:
-        print(f"⚠️ Warning: High-precision tracking failed: {e}")
-        logging.warning(f"Iris tracking initialization failed: {e}")
-        
-        try:
-            # Fallback to standard tracking (No Iris)
-            face_mesh = mp.solutions.face_mesh.FaceMesh(
-                static_image_mode=False,
-                max_num_faces=2,
-                refine_landmarks=False,
-                min_detection_confidence=0.5,
-                min_tracking_confidence=0.5
-            )
-            iris_tracking_enabled = False
-            print("✅ Face Mesh initialized in Standard Mode (No Iris Tracking)")
-            logging.info("Face Mesh initialized in Standard Mode")
-        except Exception as e2:
-            print(f"❌ Error initializing face detection: {e2}")
-            logging.error(f"Face detection initialization failed: {e2}")
+    inference = None
+    use_worker = cfg.INFERENCE_MODE == "process"
+    if not use_worker:
+        face_mesh, iris_tracking_enabled = create_face_mesh()
+        if face_mesh is None:
+            if heartbeat:
+                heartbeat.set_state(FAILED, error="Face detection could not be initialized")
             return
     
     threading.Thread(target=audio_listener, daemon=True).start()
@@ -431,11 +223,34 @@ def run_combined_detection():
         if not cap.isOpened():
             print("❌ Error: Cannot access camera. Please check permissions.")
             logging.error("Camera access denied or unavailable")
+            if heartbeat:
+                heartbeat.set_state(FAILED, error="Cannot access camera. Please check permissions.")
             return
     except Exception as e:
         print(f"❌ Error opening camera: {e}")
         logging.error(f"Camera error: {e}")
+        if heartbeat:
+            heartbeat.set_state(FAILED, error=f"Camera error: {e}")
         return
+
+    evidence = None
+    if cfg.EVIDENCE_CLIPS_ENABLED:
+        evidence = EvidenceBuffer(
+            SESSION_ID,
+            clip_dir=cfg.EVIDENCE_DIRECTORY,
+            max_bytes=int(cfg.EVIDENCE_BUFFER_MAX_MB * 1024 * 1024),
+            pre_seconds=cfg.EVIDENCE_PRE_SECONDS,
+            post_seconds=cfg.EVIDENCE_POST_SECONDS,
+            fps=cfg.EVIDENCE_FPS,
+            scale=cfg.EVIDENCE_SCALE,
+            jpeg_quality=cfg.EVIDENCE_JPEG_QUALITY,
+            workers=cfg.EVIDENCE_WORKERS
+        )
+        print(f"✅ Evidence clips enabled ({cfg.EVIDENCE_BUFFER_MAX_MB} MB pre-event buffer)")
+    recorder = None
+    timeline = None
+    buffers = None
+    display_frames = None
     
     previous_distance = 0
     look_away_start = None
@@ -444,32 +259,158 @@ def run_combined_detection():
     speaking_start = None
     speaking_start_time = None  # Track time.time() for duration calculation
     speaking_start_timestamp = None  # Track actual start time for logging
+    # Evidence clips requested at event onset, confirmed once the event counts
+    speaking_clip = None
+    look_away_clip = None
     multiple_person_start = None
+    status = "Not Speaking"
+    direction = "No face detected"
+    warning = ""
+    num_faces = 0
+
+    governor = None
+    if cfg.CPU_GOVERNOR_ENABLED:
+        governor = CpuGovernor(
+            cpu_budget=cfg.CPU_BUDGET_PERCENT,
+            min_detection_fps=cfg.MIN_DETECTION_FPS,
+            system_cpu_limit=cfg.SYSTEM_CPU_LIMIT_PERCENT,
+            interval=cfg.GOVERNOR_INTERVAL,
+            target_fps=cap.get(cv2.CAP_PROP_FPS) or 30.0,
+            on_change=log_quality_change
+        )
+        print(f"✅ CPU governor enabled (budget {cfg.CPU_BUDGET_PERCENT}%, min {cfg.MIN_DETECTION_FPS} FPS)")
 
     while cap.isOpened() and is_running:
-        ret, frame = cap.read()
+        stage_start = time.perf_counter()
+        if buffers:
+            ret, frame = buffers.read(cap)
+        else:
+            ret, frame = cap.read()
         if not ret:
             break
-        frame = cv2.flip(frame, 1)
+        if heartbeat:
+            heartbeat.frames += 1
+            if heartbeat.state == STARTING:
+                # The first frame is the point where monitoring is actually live
+                heartbeat.set_state(RUNNING)
+        if not buffers:
+            frame = cv2.flip(frame, 1)
+            if cfg.BUFFER_REUSE:
+                # Sized from the first frame; later frames are captured into them
+                buffers = FrameBuffers(frame.shape)
+                if cfg.DISPLAY_ENABLED:
+                    display_frames = deque(np.empty_like(frame) for _ in range(frame_queue.maxsize + 2))
         h, w, _ = frame.shape
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        result = face_mesh.process(rgb_frame)
+        if evidence:
+            evidence.add_frame(frame)
+        if cfg.SESSION_RECORDING_ENABLED:
+            if recorder is None:
+                recorder = SessionRecorder(
+                    SESSION_ID,
+                    frame.shape,
+                    out_dir=cfg.RECORDING_DIRECTORY,
+                    fps=cfg.RECORDING_FPS,
+                    segment_seconds=cfg.RECORDING_SEGMENT_SECONDS,
+                    slots=cfg.RECORDING_BUFFER_SLOTS
+                ).start()
+            recorder.write(frame)
+
+        if governor:
+            governor.record_stage("capture", time.perf_counter() - stage_start)
+            if governor.update() and inference:
+                inference.set_quality(governor.settings["scale"], governor.settings["gaze"])
+            if not governor.should_infer():
+                # Skipped by the governor: keep showing the last detection state
+                if cfg.DISPLAY_ENABLED:
+                    draw_status(frame, status, direction, num_faces, warning)
+                    queue_display_frame(frame, display_frames)
+                continue
+        scale = governor.settings["scale"] if governor else 1.0
+        gaze_mode = governor.settings["gaze"] if governor else "contour"
+
+        if use_worker and inference is None:
+            inference = start_worker(frame.shape, buffer_reuse=cfg.BUFFER_REUSE)
+            if inference is None:
+                # Fall back to in-process inference rather than stop monitoring
+                use_worker = False
+                face_mesh, iris_tracking_enabled = create_face_mesh()
+                if face_mesh is None:
+                    if heartbeat:
+                        heartbeat.set_state(FAILED, error="Face detection could not be initialized")
+                    break
+            else:
+                iris_tracking_enabled = inference.iris_enabled
+                inference.set_quality(scale, gaze_mode)
+
+        stage_start = time.perf_counter()
+        if inference:
+            # Pipelined one frame deep: send this frame, use the previous frame's result
+            try:
+                result = inference.process(frame)
+            except TimeoutError as e:
+                # Keep monitoring in-process for the rest of the session
+                face_mesh, iris_tracking_enabled = fall_back_to_face_mesh(inference, e)
+                inference = None
+                use_worker = False
+                if face_mesh is None:
+                    if heartbeat:
+                        heartbeat.set_state(FAILED, error="Face detection could not be initialized")
+                    break
+                continue
+            if result is None:
+                continue
+            num_faces = result.num_faces
+            faces = result.faces
+            if governor:
+                governor.record_stage("inference", time.perf_counter() - stage_start)
+                stage_start = time.perf_counter()
+        else:
+            if buffers:
+                rgb_frame = buffers.to_rgb(frame, scale)
+            else:
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                if scale != 1.0:
+                    rgb_frame = cv2.resize(rgb_frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            result = face_mesh.process(rgb_frame)
+            num_faces = len(result.multi_face_landmarks) if result.multi_face_landmarks else 0
+            if governor:
+                governor.record_stage("inference", time.perf_counter() - stage_start)
+                stage_start = time.perf_counter()
+            # Landmarks are normalised, so analysis always uses the full-size frame
+            faces = analyze_faces(result.multi_face_landmarks, frame, iris_tracking_enabled, gaze_mode, buffers)
+
+        if heartbeat:
+            heartbeat.detections += 1
+        if cfg.TIMELINE_ENABLED:
+            if timeline is None:
+                timeline = TimelineRecorder(
+                    SESSION_ID,
+                    out_dir=cfg.TIMELINE_DIRECTORY,
+                    frame_size=(w, h),
+                    iris_enabled=iris_tracking_enabled,
+                    thresholds={
+                        "lip": LIP_MOVEMENT_THRESHOLD,
+                        "audio": SPEAKING_AUDIO_THRESHOLD,
+                        "look_away": MINIMUM_LOOK_AWAY_DURATION,
+                        "min_speaking": MINIMUM_SPEAKING_DURATION,
+                    }
+                )
+            landmarks = result.landmarks if inference else landmark_subset(result.multi_face_landmarks)
+            timeline.add(time.time(), num_faces, faces, audio_level, landmarks)
 
         status = "Not Speaking"
         direction = "No face detected"
         warning = ""
-        num_faces = 0
 
-        if result.multi_face_landmarks:
-            num_faces = len(result.multi_face_landmarks)
-            
+        if num_faces:
             # Check for multiple persons
             if num_faces > 1:
                 multiple_persons_detected = True
                 current_time = datetime.now().strftime("%H:%M:%S")
                 if multiple_person_start is None:
                     multiple_person_start = current_time
-                    log_session_event("Multiple Persons", current_time, f"{num_faces} faces detected")
+                    clip = evidence.capture("Multiple Persons") if evidence else None
+                    log_session_event("Multiple Persons", current_time, f"{num_faces} faces detected", clip)
                     logging.warning(f"Multiple persons detected: {num_faces} faces")
                 warning = f"⚠️ WARNING: {num_faces} persons detected!"
             else:
@@ -477,9 +418,8 @@ def run_combined_detection():
                     multiple_person_start = None
                 multiple_persons_detected = False
 
-        if result.multi_face_landmarks:
-            for landmarks in result.multi_face_landmarks:
-                distance = get_lip_distance(landmarks.landmark, UPPER_LIP, LOWER_LIP, w, h)
+        if num_faces:
+            for distance, gaze_code in faces:
                 lip_diff = abs(distance - previous_distance)
                 lip_moving = lip_diff > LIP_MOVEMENT_THRESHOLD
                 previous_distance = distance
@@ -495,33 +435,35 @@ def run_combined_detection():
                         speaking_start = current_time
                         speaking_start_time = time.time()
                         speaking_start_timestamp = current_time
+                        if evidence:
+                            speaking_clip = evidence.capture("Speaking", timestamp=speaking_start_time,
+                                                             confirmed=False)
                 else:
                     if speaking_start is not None:
                         # Only log if speaking duration >= MINIMUM_SPEAKING_DURATION
                         duration = time.time() - speaking_start_time
                         if duration >= MINIMUM_SPEAKING_DURATION:
-                            log_session_event("Speaking", speaking_start_timestamp, current_time)
+                            if speaking_clip:
+                                evidence.confirm(speaking_clip)
+                            log_session_event("Speaking", speaking_start_timestamp, current_time, speaking_clip)
                             logging.info(f"Speaking event logged: {duration:.1f}s")
+                        elif speaking_clip:
+                            evidence.discard(speaking_clip)
+                        speaking_clip = None
                         speaking_start = None
                         speaking_start_time = None
                         speaking_start_timestamp = None
 
-                # Gaze Tracking (Only if Iris Tracking is enabled)
-                if iris_tracking_enabled:
-                    try:
-                        left_eye_direction = get_iris_position(landmarks.landmark, LEFT_EYE, LEFT_IRIS, frame)
-                        right_eye_direction = get_iris_position(landmarks.landmark, RIGHT_EYE, RIGHT_IRIS, frame)
-                        direction = left_eye_direction if left_eye_direction == right_eye_direction else "Looking Away"
-                    except Exception as e:
-                        direction = "Gaze Error"
-                else:
-                    direction = "Gaze Unavailable"
+                direction = GAZE_DIRECTIONS[int(gaze_code)]
 
         if direction != "Looking Center":
             if look_away_start is None:
                 look_away_start = datetime.now().strftime("%H:%M:%S")
                 look_away_start_time = time.time()  # Record start time for duration
                 look_away_start_timestamp = look_away_start
+                if evidence:
+                    look_away_clip = evidence.capture("Looking Away", timestamp=look_away_start_time,
+                                                      confirmed=False)
             elif (time.time() - look_away_start_time) > LOOK_AWAY_DURATION:
                 warning = "⚠ Please focus on screen!"
         else:
@@ -530,23 +472,39 @@ def run_combined_detection():
                 duration = time.time() - look_away_start_time
                 if duration >= MINIMUM_LOOK_AWAY_DURATION:
                     end_time_away = datetime.now().strftime("%H:%M:%S")
-                    log_session_event("Looking Away", look_away_start_timestamp, end_time_away)
+                    if look_away_clip:
+                        evidence.confirm(look_away_clip)
+                    log_session_event("Looking Away", look_away_start_timestamp, end_time_away, look_away_clip)
                     logging.info(f"Looking away event logged: {duration:.1f}s")
+                elif look_away_clip:
+                    evidence.discard(look_away_clip)
+            look_away_clip = None
             look_away_start = None
             look_away_start_time = None
             look_away_start_timestamp = None
 
-        # Display warnings
-        cv2.putText(frame, f"Lip Status: {status}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        cv2.putText(frame, f"Gaze Direction: {direction}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
-        cv2.putText(frame, f"Faces Detected: {num_faces}", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-        if warning:
-            cv2.putText(frame, warning, (10, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+        if governor:
+            governor.record_stage("analysis", time.perf_counter() - stage_start)
 
-        if not frame_queue.full():
-            frame_queue.put(frame)
+        # Display warnings
+        if cfg.DISPLAY_ENABLED:
+            draw_status(frame, status, direction, num_faces, warning)
+            queue_display_frame(frame, display_frames)
 
     cap.release()
+    if inference:
+        inference.close()
+    if evidence:
+        evidence.close()
+    if recorder:
+        stats = recorder.close()
+        log_session_event("Recording", datetime.now().strftime("%H:%M:%S"),
+                          f"{recorder.out_dir} ({stats['encoded']} frames, {stats['dropped']} dropped)")
+    if timeline:
+        timeline_path = timeline.close()
+        if timeline_path:
+            print(f"✅ Session timeline saved: {timeline_path} ({timeline.rows} frames)")
+            logging.info(f"Session timeline saved: {timeline_path}")
 
 # Website Monitor
 def run_website_monitor():
@@ -562,42 +520,44 @@ def run_website_monitor():
         else:
             log_event("Safari is not open.")
             log_session_event("Website Activity", str(datetime.now().strftime("%H:%M:%S")), "Safari is not open.")
-        time.sleep(5)
+        stop_event.wait(5)
 
 # Demo Mode Event Generator
 def run_demo_mode():
     if not cfg.DEMO_MODE:
         return
-    print("[Demo Mode] Started")
+    print(f"[Demo Mode] Started ({cfg.DEMO_EVENT_RATE} events/s, burstiness {cfg.LOAD_BURSTINESS})")
+    rng = random.Random()
+    event_types = list(cfg.LOAD_EVENT_MIX)
+    weights = [cfg.LOAD_EVENT_MIX[t] for t in event_types]
+    schedule = EventSchedule(cfg.DEMO_EVENT_RATE, cfg.LOAD_BURSTINESS, cfg.LOAD_BURST_SECONDS, rng)
+    due = schedule.next()
     while is_running:
-        time.sleep(random.randint(10, 20))
-        if not is_running: break
-        
-        event_type = random.choice(["Speaking", "Looking Away", "Multiple Persons"])
-        current_time = datetime.now().strftime("%H:%M:%S")
-        
-        if event_type == "Speaking":
-            end_time = (datetime.now() + timedelta(seconds=random.randint(2, 5))).strftime("%H:%M:%S")
-            log_session_event("Speaking", current_time, end_time)
-            logging.info(f"[DEMO] Generated Speaking event at {current_time}")
-        elif event_type == "Looking Away":
-            end_time = (datetime.now() + timedelta(seconds=random.randint(3, 7))).strftime("%H:%M:%S")
-            log_session_event("Looking Away", current_time, end_time)
-            logging.info(f"[DEMO] Generated Looking Away event at {current_time}")
-        elif event_type == "Multiple Persons":
-            log_session_event("Multiple Persons", current_time, "2 faces detected (Simulated)")
-            logging.info(f"[DEMO] Generated Multiple Persons event at {current_time}")
+        if time.time() < due:
+            stop_event.wait(min(0.5, due - time.time()))
+            continue
+        event_type = rng.choices(event_types, weights)[0]
+        now = datetime.now()
+        current_time = now.strftime("%H:%M:%S")
+        log_session_event(event_type, current_time, simulated_details(event_type, rng, now))
+        logging.info(f"[DEMO] Generated {event_type} event at {current_time}")
+        due = schedule.next()
 
 # Main
-from datetime import timedelta
-
 def start_detection_process():
-    global is_running
+    global is_running, heartbeat
     is_running = True
+    stop_event.clear()
+    # Lets the Flask server follow this session without waiting on it
+    heartbeat = Heartbeat(cfg.STATUS_FILE, SESSION_ID, cfg.HEARTBEAT_INTERVAL).start()
+    if cfg.LOG_ROTATE_PER_SESSION and log_handler:
+        log_handler.rotate_for_session()
+        website_log_handler.rotate_for_session()
+    clear_session_report()
     
     combined_thread = threading.Thread(target=run_combined_detection, daemon=True)
-    website_thread = threading.Thread(target=run_website_monitor, daemon=True)
-    demo_thread = threading.Thread(target=run_demo_mode, daemon=True)
+    website_thread = threading.Thread(target=run_website_monitor, name="website-monitor", daemon=True)
+    demo_thread = threading.Thread(target=run_demo_mode, name="demo-events", daemon=True)
 
     combined_thread.start()
     website_thread.start()
@@ -607,7 +567,12 @@ def start_detection_process():
     print("All features are running. Press Ctrl+C to stop.")
     try:
         while is_running:
-            if not frame_queue.empty():
+            if not combined_thread.is_alive():
+                # Detection ended on its own (camera lost or failed to open)
+                if heartbeat.state != FAILED:
+                    heartbeat.set_state(FAILED, error="Detection stopped unexpectedly")
+                break
+            if cfg.DISPLAY_ENABLED and not frame_queue.empty():
                 frame = frame_queue.get()
                 cv2.imshow("Guard-AI", frame)
                 if cv2.waitKey(1) & 0xFF == ord('q'):
@@ -617,12 +582,37 @@ def start_detection_process():
     except KeyboardInterrupt:
         print("\nExiting Guard-AI...")
     finally:
+        is_running = False
+        stop_event.set()
+        heartbeat.set_state(STOPPING)
+        # Let the detection thread flush evidence clips and the recording
+        combined_thread.join(timeout=15)
+        # Nothing may append to the session report once it is rendered and archived
+        for thread in (website_thread, demo_thread):
+            if thread.is_alive():
+                thread.join(timeout=10)
+                if thread.is_alive():
+                    logging.warning(f"{thread.name} still running after shutdown; report rendered from a snapshot")
         print("\nSaving Final Report...")
-        # Generate report with fixed filename for Flask download endpoint
+        # Generate report with fixed filename for Flask download endpoint; the
+        # cached copy lets /download-report serve it without rendering again
         session_pdf_path = "logs/final_report.pdf"
-        create_pdf_report(session_report_path, session_pdf_path)
-        print(f"Report saved as: {session_pdf_path}")
+        report_cache = ReportCache(cfg.REPORT_CACHE_DIRECTORY, int(cfg.REPORT_CACHE_MAX_MB * 1024 * 1024))
+        cached_pdf, _, _ = report_cache.get_or_render(session_report_path, create_pdf_report, REPORT_SETTINGS)
+        if cached_pdf:
+            # Replace atomically so a download never sees a half-copied report
+            shutil.copyfile(cached_pdf, session_pdf_path + ".tmp")
+            os.replace(session_pdf_path + ".tmp", session_pdf_path)
+            print(f"✅ Final report saved to {session_pdf_path}")
+            logging.info(f"PDF report generated successfully: {session_pdf_path}")
+        # Hand the finished session to the archive; ingestion happens in the Flask app
+        archive_session_file(session_report_path, cfg.SESSION_ARCHIVE_DIRECTORY, SESSION_ID,
+                             keep=cfg.SESSION_ARCHIVE_KEEP, move=False)
+        heartbeat.set_state(REPORT_READY, report_path=session_pdf_path if cached_pdf else None)
         cv2.destroyAllWindows()
+        # Finish compressing any rotated log segments before exiting
+        compressor.wait()
+        heartbeat.close()
 
 if __name__ == "__main__":
     start_detection_process()
\ No newline at end of file
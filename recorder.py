@@ -0,0 +1,218 @@
+"""
+Full-session recording for Guard AI.
+
+The detection loop copies each raw frame once into a shared-memory ring
+(see frame_ring.py) and a separate encoder process writes fixed-length video
+segments. Every segment has a sidecar of per-frame timestamps and the
+recording keeps an index.json, so offline tools can jump straight to the
+frame matching an event's timestamp.
+
+Usage (seek): python recorder.py logs/recordings/<session_id> 14:32:05
+"""
+import os
+import sys
+import json
+import time
+import bisect
+import logging
+import multiprocessing as mp
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from frame_ring import FrameRing
+
+INDEX_FILE = "index.json"
+
+
+class SessionRecorder:
+    """Hands frames to a background encoder process without blocking the caller"""
+
+    def __init__(self, session_id, frame_shape, out_dir="logs/recordings", fps=30,
+                 segment_seconds=60, slots=32, fourcc="MJPG", report_interval=10.0):
+        self.session_id = session_id
+        self.out_dir = os.path.join(out_dir, session_id)
+        self.frame_shape = tuple(frame_shape)
+        self.fps = fps
+        self.segment_seconds = segment_seconds
+        self.slots = slots
+        self.fourcc = fourcc
+        self.report_interval = report_interval
+
+        self.frames_submitted = 0
+        self.frames_dropped = 0
+        self._drops_since_report = 0
+        self._last_report = time.time()
+        self._ring = None
+        self._process = None
+        self._stop = None
+        self._encoded = None
+
+    def start(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        ctx = mp.get_context("spawn")
+        self._ring = FrameRing(ctx, self.frame_shape, self.slots)
+        self._stop = ctx.Event()
+        self._encoded = ctx.Value("q", 0)
+        self._process = ctx.Process(
+            target=_encoder_main,
+            args=(self._ring.spec(), self.out_dir, self.fps, self.segment_seconds,
+                  self.fourcc, self._stop, self._encoded),
+            name="guard-ai-encoder",
+            daemon=True
+        )
+        self._process.start()
+        print(f"✅ Session recording started ({self.out_dir})")
+        logging.info(f"Session recorder started: {self.out_dir}, {self.slots} slots, "
+                     f"{self.segment_seconds}s segments")
+        return self
+
+    def write(self, frame, timestamp=None):
+        """Queue a frame for encoding. Returns False if it had to be dropped."""
+        if self._ring is None:
+            return False
+        self.frames_submitted += 1
+        ok = self._ring.push(frame, time.time() if timestamp is None else timestamp)
+        if not ok:
+            self.frames_dropped += 1
+            self._drops_since_report += 1
+
+        now = time.time()
+        if self._drops_since_report and now - self._last_report >= self.report_interval:
+            logging.warning(f"Recorder backpressure: {self._drops_since_report} frames dropped "
+                            f"in last {now - self._last_report:.0f}s, backlog {self._ring.in_use()}/{self.slots}")
+            self._drops_since_report = 0
+            self._last_report = now
+        return ok
+
+    def stats(self):
+        backlog = self._ring.in_use() if self._ring is not None else 0
+        return {
+            "submitted": self.frames_submitted,
+            "encoded": self._encoded.value if self._encoded is not None else 0,
+            "dropped": self.frames_dropped,
+            "backlog": backlog,
+            "drop_rate": self.frames_dropped / self.frames_submitted if self.frames_submitted else 0.0
+        }
+
+    def close(self, timeout=10):
+        """Let the encoder drain the ring, finish the current segment and exit"""
+        if self._process is None:
+            return self.stats()
+        self._stop.set()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            logging.warning("Encoder process did not finish in time, terminating")
+            self._process.terminate()
+            self._process.join()
+        stats = self.stats()
+        self._ring.close()
+        self._ring = None
+        self._process = None
+        print(f"[Recorder] {stats['encoded']} frames encoded, {stats['dropped']} dropped "
+              f"({stats['drop_rate']:.1%})")
+        logging.info(f"Session recorder closed: {stats}")
+        return stats
+
+
+def _encoder_main(ring_spec, out_dir, fps, segment_seconds, fourcc, stop_event, encoded):
+    """Encoder process: drain the ring into time-indexed video segments"""
+    ring = FrameRing.attach(ring_spec)
+    h, w = ring.shape[:2]
+    index = {"fps": fps, "frame_size": [w, h], "segments": []}
+    writer = None
+    segment = None
+
+    def finish_segment():
+        writer.release()
+        np.save(os.path.join(out_dir, segment["timestamps"]), np.array(segment.pop("_ts"), dtype=np.float64))
+        index["segments"].append(segment)
+        _write_index(out_dir, index)
+
+    try:
+        while True:
+            item = ring.peek(timeout=0.1)
+            if item is None:
+                if stop_event.is_set():
+                    break
+                continue
+            slot, ts = item
+            if segment is not None and ts - segment["start"] >= segment_seconds:
+                finish_segment()
+                writer = None
+            if writer is None:
+                number = len(index["segments"]) + 1
+                name = f"segment_{number:04d}.avi"
+                writer = cv2.VideoWriter(os.path.join(out_dir, name), cv2.VideoWriter_fourcc(*fourcc), fps, (w, h))
+                segment = {"file": name, "timestamps": f"segment_{number:04d}_ts.npy",
+                           "start": ts, "end": ts, "frames": 0, "_ts": []}
+            writer.write(ring.frames[slot])
+            ring.release()
+            segment["end"] = ts
+            segment["frames"] += 1
+            segment["_ts"].append(ts)
+            encoded.value += 1
+        if writer is not None:
+            finish_segment()
+    finally:
+        ring.close()
+
+
+def _write_index(out_dir, index):
+    tmp_path = os.path.join(out_dir, INDEX_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, os.path.join(out_dir, INDEX_FILE))
+
+
+def load_index(recording_dir):
+    with open(os.path.join(recording_dir, INDEX_FILE), "r") as f:
+        return json.load(f)
+
+
+def locate(recording_dir, timestamp):
+    """Return (segment path, frame number) of the first frame at or after a UNIX timestamp"""
+    segments = load_index(recording_dir)["segments"]
+    if not segments:
+        return None
+    starts = [s["start"] for s in segments]
+    i = max(bisect.bisect_right(starts, timestamp) - 1, 0)
+    segment = segments[i]
+    stamps = np.load(os.path.join(recording_dir, segment["timestamps"]))
+    frame = int(np.searchsorted(stamps, timestamp))
+    if frame >= len(stamps):
+        if i + 1 < len(segments):
+            # Between two segments: the next one starts with the first later frame
+            return os.path.join(recording_dir, segments[i + 1]["file"]), 0
+        # Past the end of the recording: its last frame is the closest
+        frame = len(stamps) - 1
+    return os.path.join(recording_dir, segment["file"]), frame
+
+
+def read_frame_at(recording_dir, timestamp):
+    """Seek directly to the frame recorded at an event's timestamp"""
+    found = locate(recording_dir, timestamp)
+    if found is None:
+        return None
+    path, frame_number = found
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+    ret, frame = cap.read()
+    cap.release()
+    return frame if ret else None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python recorder.py <recording_dir> <HH:MM:SS>")
+        sys.exit(1)
+    recording_dir, clock = sys.argv[1], sys.argv[2]
+    first = load_index(recording_dir)["segments"][0]["start"]
+    day = datetime.fromtimestamp(first).strftime("%Y-%m-%d")
+    target = datetime.strptime(f"{day} {clock}", "%Y-%m-%d %H:%M:%S").timestamp()
+    found = locate(recording_dir, target)
+    if found is None:
+        print("❌ Recording has no segments")
+        sys.exit(1)
+    print(f"{found[0]} frame {found[1]}")
@@ -0,0 +1,299 @@
+"""
+PDF report generation for Guard AI sessions.
+
+Renders a session report (logs/session_report.txt or an archived copy under
+logs/sessions/) into the downloadable PDF. Used by main.py at the end of a
+session and by the Flask app through the report cache.
+"""
+import re
+import logging
+from datetime import datetime
+
+from fpdf import FPDF
+
+import config as cfg
+from session_log import open_report
+
+# Part of the report cache key: bump layout_version whenever the PDF layout
+# changes, so reports rendered by older code are never served again
+REPORT_SETTINGS = {
+    "layout_version": 2,
+    "title": cfg.REPORT_TITLE,
+    "include_summary": cfg.REPORT_INCLUDE_SUMMARY,
+    "max_events": 50,  # Rows per event table
+    "website_events": 20,  # Most recent website checks shown
+}
+
+
+def read_report_header(txt_path):
+    """Session ID and start time from a session report header"""
+    session_id, started = "unknown", "unknown"
+    try:
+        with open_report(txt_path) as f:
+            for _ in range(3):
+                line = f.readline()
+                match = re.search(r"Session Report - (\w+)", line)
+                if match:
+                    session_id = match.group(1)
+                match = re.search(r"Session Started: (.+)", line)
+                if match:
+                    started = match.group(1).strip()
+    except OSError:
+        pass
+    return session_id, started
+
+
+def create_pdf_report(txt_path, pdf_path, settings=None):
+    """Generate a professional PDF report from session data.
+
+    settings (REPORT_SETTINGS by default) control the title and layout.
+    Returns True once the PDF is written.
+    """
+    settings = dict(REPORT_SETTINGS, **(settings or {}))
+    max_events = settings["max_events"]
+    website_events_shown = settings["website_events"]
+    session_id, session_started = read_report_header(txt_path)
+    pdf = FPDF()
+    pdf.add_page()
+    
+    # Title
+    pdf.set_font("Arial", 'B', size=20)
+    pdf.set_text_color(0, 51, 102)  # Dark blue
+    pdf.cell(0, 15, settings["title"], ln=True, align='C')
+    pdf.ln(3)
+    
+    # Session Info Box
+    pdf.set_fill_color(240, 240, 240)  # Light gray background
+    pdf.set_font("Arial", 'B', size=10)
+    pdf.set_text_color(0, 0, 0)
+    pdf.cell(0, 8, "Session Information", ln=True, fill=True)
+    pdf.set_font("Arial", size=9)
+    pdf.cell(0, 6, f"Session ID: {session_id}", ln=True)
+    pdf.cell(0, 6, f"Session Start: {session_started}", ln=True)
+    pdf.cell(0, 6, f"Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True)
+    pdf.ln(8)
+
+    # Parse events from log file
+    website_events = []
+    speaking_events = []
+    looking_events = []
+    multiple_person_events = []
+    quality_events = []
+    evidence_clips = []
+
+    try:
+        with open_report(txt_path) as file:
+            for line in file:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+
+                # Evidence clip link is always the last field when present
+                parts = line.split("|")
+                if len(parts) >= 4 and parts[-1].strip().startswith("clip:"):
+                    evidence_clips.append({
+                        "type": parts[0].strip(),
+                        "time": parts[1].strip(),
+                        "clip": parts[-1].strip()[len("clip:"):].strip()
+                    })
+
+                # Parse different log formats
+                if line.startswith("Website Activity"):
+                    if len(parts) >= 2:
+                        time_part = parts[1].strip()
+                        details = parts[2].strip() if len(parts) > 2 else "N/A"
+                        website_events.append({"time": time_part, "details": details})
+                        
+                elif line.startswith("Speaking"):
+                    if len(parts) >= 3:
+                        start = parts[1].strip()
+                        end = parts[2].strip()
+                        speaking_events.append({"start": start, "end": end})
+                        
+                elif line.startswith("Looking Away"):
+                    if len(parts) >= 3:
+                        start = parts[1].strip()
+                        end = parts[2].strip()
+                        looking_events.append({"start": start, "end": end})
+                        
+                elif line.startswith("Multiple Persons"):
+                    if len(parts) >= 2:
+                        time_part = parts[1].strip()
+                        details = parts[2].strip() if len(parts) > 2 else "N/A"
+                        multiple_person_events.append({"time": time_part, "details": details})
+
+                elif line.startswith("Detection Quality"):
+                    if len(parts) >= 3:
+                        quality_events.append({"time": parts[1].strip(), "details": parts[2].strip()})
+
+        # Summary Statistics
+        if settings["include_summary"]:
+            pdf.set_font("Arial", 'B', size=14)
+            pdf.set_text_color(0, 51, 102)
+            pdf.cell(0, 10, "Summary Statistics", ln=True)
+            pdf.set_text_color(0, 0, 0)
+            pdf.set_font("Arial", size=10)
+
+            pdf.cell(95, 7, f"Total Speaking Incidents: {len(speaking_events)}", border=1)
+            pdf.cell(95, 7, f"Total Looking Away Incidents: {len(looking_events)}", border=1, ln=True)
+            pdf.cell(95, 7, f"Total Website Checks: {len(website_events)}", border=1)
+            pdf.cell(95, 7, f"Multiple Person Detections: {len(multiple_person_events)}", border=1, ln=True)
+            pdf.ln(10)
+
+        # Section: Speaking Events
+        pdf.set_font("Arial", 'B', 14)
+        pdf.set_text_color(0, 51, 102)
+        pdf.cell(0, 10, "Speaking Events", ln=True)
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_font("Arial", size=9)
+        
+        if speaking_events:
+            # Show only the first max_events events to avoid huge PDFs
+            display_events = speaking_events[:max_events]
+            pdf.set_font("Arial", 'B', size=9)
+            pdf.cell(20, 6, "No.", border=1, align='C')
+            pdf.cell(85, 6, "Start Time", border=1, align='C')
+            pdf.cell(85, 6, "End Time", border=1, align='C', ln=True)
+            pdf.set_font("Arial", size=8)
+            
+            for idx, event in enumerate(display_events, 1):
+                pdf.cell(20, 6, str(idx), border=1, align='C')
+                pdf.cell(85, 6, event['start'], border=1)
+                pdf.cell(85, 6, event['end'], border=1, ln=True)
+            
+            if len(speaking_events) > max_events:
+                pdf.set_font("Arial", 'I', size=8)
+                pdf.cell(0, 6, f"... and {len(speaking_events) - max_events} more events (showing first {max_events})", ln=True)
+        else:
+            pdf.cell(0, 7, "No speaking events detected.", ln=True)
+        
+        pdf.ln(8)
+
+        # Section: Looking Away Events
+        pdf.set_font("Arial", 'B', 14)
+        pdf.set_text_color(0, 51, 102)
+        pdf.cell(0, 10, "Looking Away Events", ln=True)
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_font("Arial", size=9)
+        
+        if looking_events:
+            display_events = looking_events[:max_events]
+            pdf.set_font("Arial", 'B', size=9)
+            pdf.cell(20, 6, "No.", border=1, align='C')
+            pdf.cell(85, 6, "Start Time", border=1, align='C')
+            pdf.cell(85, 6, "End Time", border=1, align='C', ln=True)
+            pdf.set_font("Arial", size=8)
+            
+            for idx, event in enumerate(display_events, 1):
+                pdf.cell(20, 6, str(idx), border=1, align='C')
+                pdf.cell(85, 6, event['start'], border=1)
+                pdf.cell(85, 6, event['end'], border=1, ln=True)
+            
+            if len(looking_events) > max_events:
+                pdf.set_font("Arial", 'I', size=8)
+                pdf.cell(0, 6, f"... and {len(looking_events) - max_events} more events (showing first {max_events})", ln=True)
+        else:
+            pdf.cell(0, 7, "No looking away events detected.", ln=True)
+        
+        pdf.ln(8)
+
+        # Section: Multiple Person Detection
+        pdf.set_font("Arial", 'B', 14)
+        pdf.set_text_color(0, 51, 102)
+        pdf.cell(0, 10, "Multiple Person Detection", ln=True)
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_font("Arial", size=9)
+        
+        if multiple_person_events:
+            pdf.set_font("Arial", 'B', size=9)
+            pdf.cell(20, 6, "No.", border=1, align='C')
+            pdf.cell(60, 6, "Time", border=1, align='C')
+            pdf.cell(110, 6, "Details", border=1, align='C', ln=True)
+            pdf.set_font("Arial", size=8)
+            
+            for idx, event in enumerate(multiple_person_events, 1):
+                pdf.cell(20, 6, str(idx), border=1, align='C')
+                pdf.cell(60, 6, event['time'], border=1)
+                pdf.cell(110, 6, event['details'][:50], border=1, ln=True)
+        else:
+            pdf.cell(0, 7, "No multiple person incidents detected.", ln=True)
+        
+        pdf.ln(8)
+
+        # Section: Detection Quality (only when the CPU governor changed it)
+        if quality_events:
+            pdf.set_font("Arial", 'B', 14)
+            pdf.set_text_color(0, 51, 102)
+            pdf.cell(0, 10, "Detection Quality Adjustments", ln=True)
+            pdf.set_text_color(0, 0, 0)
+            pdf.set_font("Arial", 'I', size=8)
+            pdf.cell(0, 6, "Detection quality was changed during this session to stay within the CPU budget.", ln=True)
+            pdf.set_font("Arial", 'B', size=9)
+            pdf.cell(25, 6, "Time", border=1, align='C')
+            pdf.cell(165, 6, "Change", border=1, align='C', ln=True)
+            pdf.set_font("Arial", size=7)
+
+            for event in quality_events[:max_events]:
+                pdf.cell(25, 6, event['time'], border=1)
+                pdf.cell(165, 6, event['details'][:120], border=1, ln=True)
+
+            pdf.ln(8)
+
+        # Section: Evidence Clips
+        if evidence_clips:
+            pdf.set_font("Arial", 'B', 14)
+            pdf.set_text_color(0, 51, 102)
+            pdf.cell(0, 10, "Evidence Clips", ln=True)
+            pdf.set_text_color(0, 0, 0)
+            pdf.set_font("Arial", 'B', size=9)
+            pdf.cell(40, 6, "Event", border=1, align='C')
+            pdf.cell(25, 6, "Time", border=1, align='C')
+            pdf.cell(125, 6, "Clip", border=1, align='C', ln=True)
+            pdf.set_font("Arial", size=7)
+
+            for clip in evidence_clips[:max_events]:
+                pdf.cell(40, 6, clip['type'], border=1)
+                pdf.cell(25, 6, clip['time'], border=1)
+                pdf.cell(125, 6, clip['clip'][-75:], border=1, ln=True)
+
+            if len(evidence_clips) > max_events:
+                pdf.set_font("Arial", 'I', size=8)
+                pdf.cell(0, 6, f"... and {len(evidence_clips) - max_events} more clips (showing first {max_events})", ln=True)
+
+            pdf.ln(8)
+
+        # Section: Website Activity (most recent checks only)
+        pdf.set_font("Arial", 'B', 14)
+        pdf.set_text_color(0, 51, 102)
+        pdf.cell(0, 10, f"Website Activity (Last {website_events_shown} Checks)", ln=True)
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_font("Arial", size=9)
+        
+        if website_events:
+            display_events = website_events[-website_events_shown:]
+            pdf.set_font("Arial", 'B', size=9)
+            pdf.cell(40, 6, "Time", border=1, align='C')
+            pdf.cell(150, 6, "Websites/Tabs", border=1, align='C', ln=True)
+            pdf.set_font("Arial", size=7)
+            
+            for event in display_events:
+                pdf.cell(40, 6, event['time'][:15], border=1)
+                # Truncate long tab names
+                tabs = event['details'][:80] + "..." if len(event['details']) > 80 else event['details']
+                pdf.cell(150, 6, tabs, border=1, ln=True)
+        else:
+            pdf.cell(0, 7, "No website activity recorded.", ln=True)
+
+        # Footer
+        pdf.ln(10)
+        pdf.set_font("Arial", 'I', size=8)
+        pdf.set_text_color(128, 128, 128)
+        pdf.cell(0, 5, "This report was automatically generated by Guard AI Proctoring System", ln=True, align='C')
+        pdf.cell(0, 5, f"For questions or concerns, please contact your exam administrator", ln=True, align='C')
+
+        pdf.output(pdf_path)
+        return True
+
+    except Exception as e:
+        print(f"❌ PDF creation error: {e}")
+        logging.error(f"PDF generation failed: {e}")
@@ -0,0 +1,138 @@
+"""
+Content-addressed cache of rendered PDF reports.
+
+A report is keyed by a SHA-256 of the session's event data and the report
+settings, so identical inputs are rendered once and then served from disk.
+The key doubles as the download's ETag. The cache directory is bounded in
+size; the least recently used reports are evicted first (a hit refreshes
+the file's mtime, so recency survives restarts and is shared between the
+detection process and the Flask app).
+"""
+import os
+import glob
+import json
+import hashlib
+import logging
+import threading
+
+from session_log import open_report
+
+
+def report_key(data, settings):
+    """SHA-256 over the (decompressed) session report bytes and the report settings"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class ReportCache:
+    """Size-bounded LRU of rendered reports on disk"""
+
+    def __init__(self, cache_dir, max_bytes=100 * 1024 * 1024):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def get(self, key):
+        """Cached report path, or None"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_or_render(self, txt_path, render, settings):
+        """Return (pdf_path, key, hit), calling render(snapshot_path, pdf_path, settings) on a miss.
+
+        The report is read once; the key and the render both use that
+        snapshot, so a report still being appended to cannot yield a PDF
+        that differs from its key. Concurrent requests for the same key
+        wait for a single render.
+        """
+        with open_report(txt_path, binary=True) as f:
+            data = f.read()
+        key = report_key(data, settings)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                path = self.get(key)
+                if path is not None:
+                    with self._lock:
+                        self.hits += 1
+                    return path, key, True
+
+                with self._lock:
+                    self.misses += 1
+                path = self.path_for(key)
+                # The cache directory may have been cleared while we were running
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                snapshot_path = f"{tmp_path}.txt"
+                try:
+                    with open(snapshot_path, "wb") as f:
+                        f.write(data)
+                    render(snapshot_path, tmp_path, settings)
+                    if not os.path.exists(tmp_path):
+                        return None, key, False
+                    os.replace(tmp_path, path)
+                finally:
+                    for leftover in (tmp_path, snapshot_path):
+                        if os.path.exists(leftover):
+                            os.remove(leftover)
+        finally:
+            with self._lock:
+                self._key_locks.pop(key, None)
+        self.evict()
+        return path, key, False
+
+    def evict(self):
+        """Delete least recently used reports until the cache fits max_bytes"""
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*.pdf")):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        # Never evict the newest entry, even if it alone is over the limit
+        while len(entries) > 1 and total > self.max_bytes:
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+            logging.info(f"Report cache evicted {os.path.basename(path)}")
+
+    def stats(self):
+        entries = glob.glob(os.path.join(self.cache_dir, "*.pdf"))
+        size = 0
+        for path in entries:
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(entries),
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,137 @@
+"""
+Reading and writing Guard AI session reports.
+
+A session report (logs/session_report.txt, archived under logs/sessions/)
+starts with a header and then holds one event per line:
+
+    # Guard AI Session Report - <session_id>
+    # Session Started: YYYY-mm-dd HH:MM:SS
+
+    <event type> | <HH:MM:SS> | <end time or details> [| clip: <path>]
+
+Event times only carry the time of day; they are resolved against the
+session start date, rolling over to the next day past midnight.
+"""
+import os
+import re
+import gzip
+from datetime import datetime, time, timedelta
+
+# Event types whose second field is an end time rather than free-form details
+INTERVAL_EVENTS = ("Speaking", "Looking Away")
+
+
+def open_report(path, binary=False):
+    """Open a session report, transparently handling .gz archives.
+
+    An archived report that was compressed after it was looked up is read
+    from its .gz instead.
+    """
+    if not path.endswith(".gz"):
+        try:
+            if binary:
+                return open(path, "rb")
+            return open(path, "r", encoding="utf-8", errors="replace")
+        except FileNotFoundError:
+            if not os.path.exists(path + ".gz"):
+                raise
+            path += ".gz"
+    if binary:
+        return gzip.open(path, "rb")
+    return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+
+
+def write_report_header(path, session_id, started_at, extra_lines=()):
+    """Start a new session report, replacing any previous file at path"""
+    with open(path, "w") as f:
+        f.write(f"# Guard AI Session Report - {session_id}\n")
+        f.write(f"# Session Started: {started_at.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        for line in extra_lines:
+            f.write(f"# {line}\n")
+        f.write("\n")
+
+
+def append_event(path, event_type, start_time, details, clip=None):
+    """Append one event line to a session report"""
+    with open(path, "a") as f:
+        if clip:
+            f.write(f"{event_type} | {start_time} | {details} | clip: {clip}\n")
+        else:
+            f.write(f"{event_type} | {start_time} | {details}\n")
+
+
+def _resolve(clock, previous):
+    """Turn HH:MM:SS into a datetime on or after the previous event"""
+    # Split by hand; strptime dominated the cost of ingesting large archives
+    try:
+        hours, minutes, seconds = clock.split(":")
+        t = time(int(hours), int(minutes), int(seconds))
+    except ValueError:
+        return None
+    resolved = datetime.combine(previous.date(), t)
+    # Allow small out-of-order writes, but treat a large backwards jump as midnight
+    if resolved < previous - timedelta(hours=1):
+        resolved += timedelta(days=1)
+    return resolved
+
+
+def parse_session_report(path):
+    """Parse a session report into a dict with session_id, started_at and events.
+
+    Each event has type, start (datetime), end (datetime or None), details and clip.
+    """
+    session_id = None
+    started_at = None
+    events = []
+
+    with open_report(path) as f:
+        lines = f.readlines()
+
+    for line in lines:
+        line = line.strip()
+        if line.startswith("#"):
+            match = re.search(r"Session Report - (\w+)", line)
+            if match:
+                session_id = match.group(1)
+            match = re.search(r"Session Started: (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})", line)
+            if match:
+                started_at = datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S")
+            continue
+
+    if started_at is None:
+        started_at = datetime.fromtimestamp(os.path.getmtime(path))
+    previous = started_at
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) < 2:
+            continue
+
+        clip = None
+        if len(parts) >= 4 and parts[-1].startswith("clip:"):
+            clip = parts.pop()[len("clip:"):].strip()
+
+        start = _resolve(parts[1], previous)
+        if start is None:
+            continue
+        previous = start
+        end = None
+        details = " | ".join(parts[2:]) if len(parts) > 2 else ""
+        if parts[0] in INTERVAL_EVENTS and len(parts) >= 3:
+            end = _resolve(parts[2], start)
+            details = ""
+
+        events.append({
+            "type": parts[0],
+            "start": start,
+            "end": end,
+            "details": details,
+            "clip": clip
+        })
+
+    if session_id is None:
+        session_id = os.path.basename(path).split(".")[0]
+    return {"session_id": session_id, "started_at": started_at, "events": events}
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Multi-stream detection host for exam halls.
+
+Runs detection for N video sources (camera indexes or video files) in one
+process. Each source is read by its own capture thread that keeps only the
+newest frame. A single scheduler hands frames to a fixed pool of FaceMesh
+instances: worker processes in "process" inference mode, threads otherwise.
+Scheduling is earliest-deadline-first on each stream's next due time, which
+gives every stream its target FPS when there is capacity and a share
+proportional to its target when there is not. Each stream keeps its own
+detection state, session report and PDF.
+
+A FaceMesh instance that dies, or holds a frame longer than
+STREAM_INFERENCE_TIMEOUT, is restarted and its streams are rescheduled.
+
+Usage: python stream_host.py <source>[@fps] [<source>[@fps] ...]
+       e.g. python stream_host.py 0 1 hall_cam_3.mp4@5
+"""
+import os
+import sys
+import time
+import uuid
+import queue
+import signal
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+import config as cfg
+from detection import GAZE_DIRECTIONS, create_face_mesh, analyze_faces
+from inference_worker import InferenceWorker, InferenceResult, RESULT_SIZE, encode_result
+from log_rotation import setup_rotating_logger, archive_session_file, compressor
+from report import create_pdf_report
+from session_log import write_report_header, append_event
+
+# Frames in flight per FaceMesh instance; two keeps an instance busy while
+# the scheduler hands it the next frame
+PIPELINE_DEPTH = 2
+
+
+def parse_source(spec, default_fps):
+    """'0' -> camera 0, 'exam.mp4@5' -> file at 5 detections per second"""
+    fps = default_fps
+    if "@" in spec:
+        spec, rate = spec.rsplit("@", 1)
+        fps = float(rate)
+    return (int(spec) if spec.isdigit() else spec), fps
+
+
+class StreamSource(threading.Thread):
+    """Reads one camera or video file, keeping only the newest frame"""
+
+    def __init__(self, source, frame_size, realtime=True, loop=False):
+        super().__init__(name=f"capture-{source}", daemon=True)
+        self.source = source
+        self.frame_size = frame_size
+        # Files are paced at their own frame rate so they behave like cameras
+        self.realtime = realtime
+        self.loop = loop
+        self.frames_read = 0
+        self.finished = False
+        self.running = True
+        self._lock = threading.Lock()
+        self._latest = None
+
+    def latest(self):
+        """(frame, seq, capture timestamp) of the newest frame, or None"""
+        with self._lock:
+            return self._latest
+
+    def run(self):
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            print(f"❌ Error: Cannot open video source {self.source}")
+            logging.error(f"Stream source unavailable: {self.source}")
+            self.finished = True
+            return
+        is_file = isinstance(self.source, str)
+        file_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        next_frame = time.perf_counter()
+        try:
+            while self.running:
+                ret, frame = cap.read()
+                if not ret:
+                    if is_file and self.loop:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    break
+                if (frame.shape[1], frame.shape[0]) != self.frame_size:
+                    frame = cv2.resize(frame, self.frame_size, interpolation=cv2.INTER_AREA)
+                self.frames_read += 1
+                with self._lock:
+                    self._latest = (frame, self.frames_read, time.time())
+                if is_file and self.realtime:
+                    next_frame += 1.0 / file_fps
+                    delay = next_frame - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_frame = time.perf_counter()
+        finally:
+            cap.release()
+            self.finished = True
+
+
+class LocalInference:
+    """FaceMesh on a thread with the same interface as InferenceWorker
+    (start, submit, get_result, is_alive, close).
+
+    Used for the pool when INFERENCE_MODE is "thread".
+    """
+
+    def __init__(self, slots=PIPELINE_DEPTH, static_image_mode=True):
+        self.static_image_mode = static_image_mode
+        self.iris_enabled = False
+        self._inbox = queue.Queue(maxsize=slots)
+        self._outbox = queue.Queue()
+        self._thread = None
+        self._face_mesh = None
+
+    def start(self, timeout=30):
+        self._face_mesh, self.iris_enabled = create_face_mesh(static_image_mode=self.static_image_mode)
+        if self._face_mesh is None:
+            return False
+        self._thread = threading.Thread(target=self._run, name="facemesh-pool", daemon=True)
+        self._thread.start()
+        return True
+
+    def submit(self, frame, timestamp=None):
+        try:
+            self._inbox.put_nowait((frame, time.time() if timestamp is None else timestamp))
+            return True
+        except queue.Full:
+            return False
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_result(self, timeout=None):
+        try:
+            if timeout == 0:
+                return self._outbox.get_nowait()
+            return self._outbox.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _run(self):
+        # Own reference: an abandoned thread keeps its graph until it exits
+        face_mesh = self._face_mesh
+        seq = 0
+        out = np.zeros(RESULT_SIZE, dtype=np.float64)
+        while True:
+            item = self._inbox.get()
+            if item is None:
+                break
+            frame, ts = item
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            result = face_mesh.process(rgb_frame)
+            faces = analyze_faces(result.multi_face_landmarks, frame, self.iris_enabled)
+            # Same encoding as the worker process, so both decode identically
+            encode_result(out, seq, ts, result.multi_face_landmarks, faces, self.iris_enabled)
+            self._outbox.put(InferenceResult(out.tobytes()))
+            seq += 1
+
+    def close(self, timeout=5):
+        stuck = False
+        if self._thread is not None:
+            try:
+                self._inbox.put(None, timeout=timeout)
+                self._thread.join(timeout)
+            except queue.Full:
+                pass
+            stuck = self._thread.is_alive()
+            self._thread = None
+        if self._face_mesh is not None:
+            if stuck:
+                # Closing the graph under a running process() call can crash the
+                # whole host; leave it to the daemon thread
+                logging.warning("FaceMesh instance still busy on close; abandoning it")
+            else:
+                self._face_mesh.close()
+            self._face_mesh = None
+
+
+class StreamSession:
+    """Detection state and session report of one stream"""
+
+    def __init__(self, stream_id, source, target_fps, out_dir):
+        self.stream_id = stream_id
+        self.source = source
+        self.target_fps = target_fps
+        self.period = 1.0 / target_fps
+        self.session_id = str(uuid.uuid4())[:8]
+        self.started_at = datetime.now()
+        self.out_dir = os.path.join(out_dir, stream_id)
+        self.report_path = os.path.join(self.out_dir, "session_report.txt")
+        os.makedirs(self.out_dir, exist_ok=True)
+        write_report_header(self.report_path, self.session_id, self.started_at, [f"Stream: {stream_id} ({source})"])
+
+        # Scheduling
+        self.next_due = time.time()
+        self.last_seq = 0
+        self.in_flight = False
+        self.frames_inferred = 0
+        self.latencies = deque(maxlen=2000)
+
+        # Detection state
+        self.previous_distance = 0
+        self.speaking_start = None
+        self.look_away_start = None
+        self.multiple_person_start = None
+        self.direction = "No face detected"
+        self.num_faces = 0
+
+    def log_event(self, event_type, start_time, details):
+        append_event(self.report_path, event_type, start_time, details)
+        logging.info(f"[{self.stream_id}] {event_type} | {start_time} | {details}")
+
+    def handle_result(self, result, now):
+        """Update detection state from one inference result"""
+        self.in_flight = False
+        self.frames_inferred += 1
+        self.latencies.append(now - result.timestamp)
+        ts = result.timestamp
+        clock = datetime.fromtimestamp(ts).strftime("%H:%M:%S")
+        self.num_faces = result.num_faces
+
+        if result.num_faces > 1:
+            if self.multiple_person_start is None:
+                self.multiple_person_start = ts
+                self.log_event("Multiple Persons", clock, f"{result.num_faces} faces detected")
+        else:
+            self.multiple_person_start = None
+
+        # Hall cameras have no microphone, so speaking is judged on lip movement alone
+        lip_moving = False
+        direction = "No face detected"
+        for distance, gaze_code in result.faces:
+            lip_moving = abs(distance - self.previous_distance) > cfg.LIP_MOVEMENT_THRESHOLD
+            self.previous_distance = distance
+            direction = GAZE_DIRECTIONS[int(gaze_code)]
+        self.direction = direction
+
+        if lip_moving:
+            if self.speaking_start is None:
+                self.speaking_start = ts
+        elif self.speaking_start is not None:
+            if ts - self.speaking_start >= cfg.MINIMUM_SPEAKING_DURATION:
+                start = datetime.fromtimestamp(self.speaking_start).strftime("%H:%M:%S")
+                self.log_event("Speaking", start, clock)
+            self.speaking_start = None
+
+        if direction != "Looking Center":
+            if self.look_away_start is None:
+                self.look_away_start = ts
+        elif self.look_away_start is not None:
+            if ts - self.look_away_start >= cfg.MINIMUM_LOOK_AWAY_DURATION:
+                start = datetime.fromtimestamp(self.look_away_start).strftime("%H:%M:%S")
+                self.log_event("Looking Away", start, clock)
+            self.look_away_start = None
+
+    def stats(self, elapsed):
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            "stream_id": self.stream_id,
+            "session_id": self.session_id,
+            "target_fps": self.target_fps,
+            "fps": self.frames_inferred / elapsed if elapsed > 0 else 0.0,
+            "frames_inferred": self.frames_inferred,
+            "latency_p50_ms": float(np.percentile(latencies, 50)),
+            "latency_p95_ms": float(np.percentile(latencies, 95)),
+        }
+
+    def finish(self):
+        """Write the stream's PDF and hand its report to the session archive"""
+        pdf_path = os.path.join(self.out_dir, "final_report.pdf")
+        if create_pdf_report(self.report_path, pdf_path):
+            print(f"✅ [{self.stream_id}] Final report saved to {pdf_path}")
+            logging.info(f"PDF report generated successfully: {pdf_path}")
+        archive_session_file(self.report_path, cfg.SESSION_ARCHIVE_DIRECTORY, self.session_id,
+                             keep=cfg.SESSION_ARCHIVE_KEEP, move=False)
+
+
+class StreamHost:
+    """Schedules N streams over a fixed pool of FaceMesh instances"""
+
+    def __init__(self, sources, pool_size=2, frame_size=(640, 480), mode="thread",
+                 out_dir="logs/streams", realtime=True, loop=False, engine_factory=None,
+                 inference_timeout=10.0):
+        self.frame_size = frame_size
+        self.pool_size = pool_size
+        self.mode = mode
+        # Returns a started FaceMesh engine, or None if it could not start
+        self.engine_factory = engine_factory or self._start_engine
+        self.inference_timeout = inference_timeout
+        self.engine_restarts = 0
+        self.error = None
+        self.running = False
+        self.sources = []
+        self.sessions = []
+        for index, (source, fps) in enumerate(sources):
+            self.sources.append(StreamSource(source, frame_size, realtime=realtime, loop=loop))
+            self.sessions.append(StreamSession(f"stream{index}", source, fps, out_dir))
+        self._pool = []
+        self._started_at = None
+
+    def _start_engine(self):
+        if self.mode == "process":
+            shape = (self.frame_size[1], self.frame_size[0], 3)
+            engine = InferenceWorker(shape, slots=PIPELINE_DEPTH, static_image_mode=True)
+            if engine.start():
+                return engine
+            print("⚠️ Warning: Inference worker failed, using in-process FaceMesh")
+            logging.warning("Stream host worker failed to start, falling back to a thread")
+        engine = LocalInference(slots=PIPELINE_DEPTH)
+        return engine if engine.start() else None
+
+    def start(self):
+        for _ in range(self.pool_size):
+            engine = self.engine_factory()
+            if engine is None:
+                self.close()
+                return False
+            self._pool.append({"engine": engine, "in_flight": deque()})
+        for source in self.sources:
+            source.start()
+        self._started_at = time.time()
+        self.running = True
+        print(f"✅ Stream host started: {len(self.sources)} streams, {self.pool_size} FaceMesh instances ({self.mode})")
+        logging.info(f"Stream host started with {len(self.sources)} streams and {self.pool_size} FaceMesh instances")
+        return True
+
+    def _next_stream(self, now):
+        """Ready stream with the earliest due time, or None"""
+        best = None
+        best_frame = None
+        for session, source in zip(self.sessions, self.sources):
+            if session.in_flight or session.next_due > now:
+                continue
+            latest = source.latest()
+            if latest is None or latest[1] <= session.last_seq:
+                continue
+            if best is None or session.next_due < best.next_due:
+                best, best_frame = session, latest
+        return best, best_frame
+
+    def _recover(self, slot, reason):
+        """Replace a failed engine; its streams are rescheduled on the next step"""
+        print(f"⚠️ Warning: FaceMesh instance {reason}, restarting it")
+        logging.error(f"Stream host FaceMesh instance {reason}; restarting it")
+        for session, _ in slot["in_flight"]:
+            session.in_flight = False
+        slot["in_flight"].clear()
+        try:
+            slot["engine"].close(timeout=1)
+        except Exception as e:
+            logging.warning(f"Closing failed FaceMesh instance: {e}")
+        engine = self.engine_factory()
+        if engine is not None:
+            slot["engine"] = engine
+            self.engine_restarts += 1
+            return
+        self._pool.remove(slot)
+        logging.error(f"FaceMesh instance could not be restarted; {len(self._pool)} left")
+        if not self._pool:
+            self.error = "Every FaceMesh instance failed"
+            print(f"❌ Error: {self.error}")
+            for session in self.sessions:
+                session.log_event("Detection Error", datetime.now().strftime("%H:%M:%S"), self.error)
+            self.running = False
+
+    def step(self):
+        """Collect finished results and dispatch due frames. Returns True if anything happened."""
+        progressed = False
+        now = time.time()
+        for slot in list(self._pool):
+            while slot["in_flight"]:
+                result = slot["engine"].get_result(timeout=0)
+                if result is None:
+                    break
+                session, _ = slot["in_flight"].popleft()
+                session.handle_result(result, time.time())
+                progressed = True
+            if slot["in_flight"]:
+                # Waiting on this engine: make sure it is alive and not stuck
+                if not slot["engine"].is_alive():
+                    self._recover(slot, "stopped")
+                    progressed = True
+                elif now - slot["in_flight"][0][1] > self.inference_timeout:
+                    self._recover(slot, f"did not answer within {self.inference_timeout:.0f}s")
+                    progressed = True
+
+        now = time.time()
+        # Least busy instance first
+        for slot in sorted(self._pool, key=lambda s: len(s["in_flight"])):
+            while len(slot["in_flight"]) < PIPELINE_DEPTH:
+                session, latest = self._next_stream(now)
+                if session is None:
+                    break
+                frame, seq, ts = latest
+                if not slot["engine"].submit(frame, ts):
+                    break
+                session.last_seq = seq
+                session.in_flight = True
+                # A stream that fell behind may not burst to catch up
+                session.next_due = max(session.next_due, now - session.period) + session.period
+                slot["in_flight"].append((session, now))
+                progressed = True
+        return progressed
+
+    def run(self, duration=None):
+        """Schedule until stop(), the duration elapses or every source has ended"""
+        deadline = None if duration is None else time.time() + duration
+        while self.running:
+            if deadline is not None and time.time() >= deadline:
+                break
+            if not self.step():
+                if all(s.finished for s in self.sources) and not any(slot["in_flight"] for slot in self._pool):
+                    break
+                time.sleep(0.001)
+        self.running = False
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        elapsed = time.time() - self._started_at if self._started_at else 0.0
+        streams = [session.stats(elapsed) for session in self.sessions]
+        return {
+            "elapsed": elapsed,
+            "aggregate_fps": sum(s["fps"] for s in streams),
+            "streams": streams,
+        }
+
+    def close(self, write_reports=True):
+        for source in self.sources:
+            source.running = False
+        for source in self.sources:
+            if source.is_alive():
+                source.join(timeout=5)
+        for slot in self._pool:
+            slot["engine"].close()
+        self._pool = []
+        if write_reports:
+            for session in self.sessions:
+                session.finish()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python stream_host.py <source>[@fps] [<source>[@fps] ...]")
+        sys.exit(1)
+
+    os.makedirs("logs", exist_ok=True)
+    setup_rotating_logger(
+        logging.getLogger(), "logs/stream_host_logs.txt", "%(asctime)s - %(message)s",
+        int(cfg.LOG_MAX_MB * 1024 * 1024), cfg.LOG_BACKUP_COUNT, int(cfg.LOG_MAX_TOTAL_MB * 1024 * 1024)
+    )
+    sources = [parse_source(spec, cfg.STREAM_TARGET_FPS) for spec in sys.argv[1:]]
+    host = StreamHost(
+        sources,
+        pool_size=cfg.STREAM_POOL_SIZE,
+        frame_size=(cfg.STREAM_FRAME_WIDTH, cfg.STREAM_FRAME_HEIGHT),
+        mode=cfg.INFERENCE_MODE,
+        out_dir=cfg.STREAM_DIRECTORY,
+        inference_timeout=cfg.STREAM_INFERENCE_TIMEOUT
+    )
+    signal.signal(signal.SIGTERM, lambda sig, frame: host.stop())
+    if not host.start():
+        print("❌ Error: Could not start the FaceMesh pool")
+        sys.exit(1)
+
+    print("All streams are running. Press Ctrl+C to stop.")
+    try:
+        host.run()
+    except KeyboardInterrupt:
+        print("\nStopping stream host...")
+    finally:
+        host.stop()
+        stats = host.stats()
+        host.close()
+        for s in stats["streams"]:
+            print(f"{s['stream_id']} (session {s['session_id']}): {s['fps']:.1f}/{s['target_fps']:.0f} FPS, "
+                  f"latency p50 {s['latency_p50_ms']:.0f} ms, p95 {s['latency_p95_ms']:.0f} ms")
+        print(f"Reports saved under {cfg.STREAM_DIRECTORY}/")
+        compressor.wait()
+        if host.error:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
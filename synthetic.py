@@ -0,0 +1,62 @@
+"""
+Synthetic proctoring events, shared by demo mode (main.py) and the load
+generator (load_generator.py).
+
+EventSchedule gives arrival times at a mean rate, either evenly random or in
+bursts; simulated_details fills in the second report field the way the real
+detector would.
+"""
+import time
+from datetime import datetime, timedelta
+
+
+class EventSchedule:
+    """Arrival times of one session's events.
+
+    With burstiness 1 arrivals are Poisson at `rate`. With burstiness B > 1
+    events only arrive during bursts, at B x the rate; bursts last
+    burst_seconds on average and are separated by quiet periods (B - 1)
+    times as long, so the long-run mean stays `rate`.
+    """
+
+    def __init__(self, rate, burstiness, burst_seconds, rng, start=None):
+        self.rate = rate
+        self.burstiness = max(1.0, burstiness)
+        self.burst_seconds = burst_seconds
+        self.rng = rng
+        self.now = time.time() if start is None else start
+        self._burst_ends = self.now + rng.expovariate(1.0 / burst_seconds)
+        if rng.random() >= 1.0 / self.burstiness:
+            # Begin in a quiet period as often as the long-run share, so short sessions are not biased
+            self.now += rng.expovariate(1.0 / (burst_seconds * (self.burstiness - 1)))
+            self._burst_ends = self.now + rng.expovariate(1.0 / burst_seconds)
+
+    def next(self):
+        if self.rate <= 0:
+            return float("inf")
+        if self.burstiness == 1.0:
+            self.now += self.rng.expovariate(self.rate)
+            return self.now
+        while True:
+            arrival = self.now + self.rng.expovariate(self.rate * self.burstiness)
+            if arrival < self._burst_ends:
+                self.now = arrival
+                return arrival
+            # The burst ended first: sit out a quiet period, then start the next burst
+            quiet = self.rng.expovariate(1.0 / (self.burst_seconds * (self.burstiness - 1)))
+            self.now = self._burst_ends + quiet
+            self._burst_ends = self.now + self.rng.expovariate(1.0 / self.burst_seconds)
+
+
+def simulated_details(event_type, rng, now=None):
+    """Second report field for an event, shaped like the real detector's"""
+    now = now or datetime.now()
+    if event_type == "Speaking":
+        return (now + timedelta(seconds=rng.randint(2, 5))).strftime("%H:%M:%S")
+    if event_type == "Looking Away":
+        return (now + timedelta(seconds=rng.randint(3, 7))).strftime("%H:%M:%S")
+    if event_type == "Multiple Persons":
+        return "2 faces detected (Simulated)"
+    if event_type == "Website Activity":
+        return "Tabs: Simulated Tab"
+    return "Simulated"
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Session timelines and offline re-scoring.
+
+With TIMELINE_ENABLED the detection loop records one row per analysed frame
+into a columnar NumPy archive (logs/timelines/timeline_<session>.npz):
+
+    ts            float64 (N,)                    frame timestamp
+    num_faces     uint8   (N,)                    faces found by FaceMesh
+    audio_level   float32 (N,)                    latest microphone level
+    lip_distance  float32 (N, MAX_FACES)          NaN where there is no face
+    gaze_code     int8    (N, MAX_FACES)          GAZE_DIRECTIONS index, -1 = no face
+    landmarks     float16 (N, MAX_FACES, P, 2)    LANDMARK_SUBSET, normalised
+
+rescore() replays a timeline through the same speaking, looking-away and
+multiple-person rules as the live loop, vectorized over the whole session,
+so thresholds can be tuned without running the session again. sweep()
+re-scores a grid of thresholds in parallel across cores; each worker runs
+the threshold-independent prepare() step once and only score() per set.
+
+Usage: python timeline.py <timeline.npz> [lip=1.5,2.5,3.5] [audio=0.005,0.01]
+                          [look_away=1,2,3] [min_speaking=0.5,1] [workers=N]
+"""
+import os
+import sys
+import time
+import json
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from detection import MAX_FACES, LANDMARK_SUBSET, GAZE_CODES
+
+TIMELINE_VERSION = 1
+LOOKING_CENTER = GAZE_CODES["Looking Center"]
+
+
+class TimelineRecorder:
+    """Collects per-frame detection inputs in preallocated column chunks"""
+
+    def __init__(self, session_id, out_dir, frame_size, iris_enabled, thresholds, chunk_rows=4096):
+        self.session_id = session_id
+        self.path = os.path.join(out_dir, f"timeline_{session_id}.npz")
+        self.meta = {
+            "version": TIMELINE_VERSION,
+            "session_id": session_id,
+            "frame_width": frame_size[0],
+            "frame_height": frame_size[1],
+            "iris_enabled": bool(iris_enabled),
+            "landmark_subset": LANDMARK_SUBSET,
+            "thresholds": thresholds,
+        }
+        self.rows = 0
+        self._chunk_rows = chunk_rows
+        self._chunks = []
+        self._new_chunk()
+        os.makedirs(out_dir, exist_ok=True)
+
+    def _new_chunk(self):
+        n = self._chunk_rows
+        self._chunk = {
+            "ts": np.zeros(n, dtype=np.float64),
+            "num_faces": np.zeros(n, dtype=np.uint8),
+            "audio_level": np.zeros(n, dtype=np.float32),
+            "lip_distance": np.full((n, MAX_FACES), np.nan, dtype=np.float32),
+            "gaze_code": np.full((n, MAX_FACES), -1, dtype=np.int8),
+            "landmarks": np.full((n, MAX_FACES, len(LANDMARK_SUBSET), 2), np.nan, dtype=np.float16),
+        }
+        self._index = 0
+
+    def add(self, timestamp, num_faces, faces, audio_level, landmarks=None):
+        """Record one analysed frame. faces is the (n, 2) array from analyze_faces."""
+        chunk, i = self._chunk, self._index
+        chunk["ts"][i] = timestamp
+        chunk["num_faces"][i] = min(num_faces, 255)
+        chunk["audio_level"][i] = audio_level
+        n = min(len(faces), MAX_FACES)
+        if n:
+            chunk["lip_distance"][i, :n] = faces[:n, 0]
+            chunk["gaze_code"][i, :n] = faces[:n, 1]
+            if landmarks is not None and len(landmarks):
+                chunk["landmarks"][i, :n] = landmarks[:n]
+        self._index += 1
+        self.rows += 1
+        if self._index == self._chunk_rows:
+            self._chunks.append(self._chunk)
+            self._new_chunk()
+
+    def close(self):
+        """Write the timeline and return its path (None if nothing was recorded)"""
+        if self._index:
+            self._chunks.append({k: v[:self._index] for k, v in self._chunk.items()})
+            self._new_chunk()
+        if not self.rows:
+            return None
+        columns = {key: np.concatenate([c[key] for c in self._chunks]) for key in self._chunks[0]}
+        self._chunks = []
+        tmp_path = self.path + ".tmp.npz"
+        np.savez_compressed(tmp_path, meta=np.array(json.dumps(self.meta)), **columns)
+        os.replace(tmp_path, self.path)
+        return self.path
+
+
+def load_timeline(path):
+    """Load a timeline into a dict of columns plus 'meta'"""
+    with np.load(path) as data:
+        timeline = {key: data[key] for key in data.files if key != "meta"}
+        timeline["meta"] = json.loads(str(data["meta"]))
+    return timeline
+
+
+def _runs(active):
+    """(start, end) index pairs of True runs that were closed by a False.
+
+    Mirrors the live loop, where an event is only logged when its condition ends.
+    """
+    edges = np.diff(active.astype(np.int8), prepend=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts[:len(ends)], ends
+
+
+def prepare(timeline):
+    """Threshold-independent columns for scoring, computed once per timeline"""
+    ts = timeline["ts"]
+    num_faces = timeline["num_faces"]
+    lip = timeline["lip_distance"]
+
+    # Speaking: the live loop walks faces in order, comparing each lip distance
+    # with the previous one seen (across faces and frames)
+    present = ~np.isnan(lip)
+    face_frames = np.flatnonzero(present) // lip.shape[1]
+    distances = lip[present]
+
+    # Looking away: direction comes from the last face of each frame
+    gaze = timeline["gaze_code"]
+    last_gaze = gaze[:, 0]
+    for column in range(1, gaze.shape[1]):
+        last_gaze = np.where(present[:, column], gaze[:, column], last_gaze)
+    away = ~present[:, 0] | (last_gaze != LOOKING_CENTER)
+    starts, ends = _runs(away)
+
+    # Multiple persons: one event each time a second face appears; frames with
+    # no face neither start nor end the condition, as in the live loop
+    with_faces = np.flatnonzero(num_faces > 0)
+    multiple = num_faces[with_faces] > 1
+    multiple_starts = with_faces[np.diff(multiple.astype(np.int8), prepend=0) == 1]
+
+    return {
+        "face_ts": ts[face_frames],
+        "face_audio": timeline["audio_level"][face_frames],
+        "lip_diff": np.abs(np.diff(distances, prepend=0.0)),
+        "away_start": ts[starts],
+        "away_end": ts[ends],
+        "multiple_persons": ts[multiple_starts],
+    }
+
+
+def score(prepared, lip_threshold, audio_threshold, min_look_away, min_speaking):
+    """Apply one set of thresholds to a prepare()d timeline"""
+    face_ts = prepared["face_ts"]
+    speaking = (prepared["lip_diff"] > lip_threshold) & (prepared["face_audio"] > audio_threshold)
+    starts, ends = _runs(speaking)
+    keep = face_ts[ends] - face_ts[starts] >= min_speaking
+    away_start, away_end = prepared["away_start"], prepared["away_end"]
+    away_keep = away_end - away_start >= min_look_away
+    return {
+        "speaking": np.column_stack([face_ts[starts[keep]], face_ts[ends[keep]]]),
+        "looking_away": np.column_stack([away_start[away_keep], away_end[away_keep]]),
+        "multiple_persons": prepared["multiple_persons"],
+    }
+
+
+def rescore(timeline, lip_threshold, audio_threshold, min_look_away, min_speaking):
+    """Re-run the detection rules over a timeline.
+
+    Returns (start, end) timestamp pairs for speaking and looking-away events
+    and the start timestamps of multiple-person events.
+    """
+    return score(prepare(timeline), lip_threshold, audio_threshold, min_look_away, min_speaking)
+
+
+def summarize(events):
+    return {
+        "speaking_count": len(events["speaking"]),
+        "speaking_seconds": float(np.sum(events["speaking"][:, 1] - events["speaking"][:, 0])),
+        "looking_away_count": len(events["looking_away"]),
+        "looking_away_seconds": float(np.sum(events["looking_away"][:, 1] - events["looking_away"][:, 0])),
+        "multiple_persons_count": len(events["multiple_persons"]),
+    }
+
+
+# Each sweep worker loads and prepares the timeline once
+_worker_prepared = None
+
+
+def _init_worker(path):
+    global _worker_prepared
+    _worker_prepared = prepare(load_timeline(path))
+
+
+def _score_batch(combinations):
+    return [dict(zip(("lip", "audio", "look_away", "min_speaking"), combo),
+                 **summarize(score(_worker_prepared, *combo)))
+            for combo in combinations]
+
+
+def sweep(path, lip_values, audio_values, look_away_values, min_speaking_values, workers=None):
+    """Re-score every threshold combination, spread over a process pool"""
+    combinations = list(itertools.product(lip_values, audio_values, look_away_values, min_speaking_values))
+    workers = workers or os.cpu_count() or 1
+    # A few batches per worker keeps the pool busy without per-task overhead
+    batch = max(1, len(combinations) // (workers * 4))
+    batches = [combinations[i:i + batch] for i in range(0, len(combinations), batch)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,)) as pool:
+        results = []
+        for scored in pool.map(_score_batch, batches):
+            results.extend(scored)
+    return results
+
+
+def _parse_values(text):
+    return [float(v) for v in text.split(",") if v]
+
+
+def main():
+    import config as cfg
+
+    if len(sys.argv) < 2:
+        print(__doc__.split("Usage:")[1].strip())
+        sys.exit(1)
+    path = sys.argv[1]
+    grid = {
+        "lip": [cfg.LIP_MOVEMENT_THRESHOLD],
+        "audio": [cfg.SPEAKING_AUDIO_THRESHOLD],
+        "look_away": [cfg.MINIMUM_LOOK_AWAY_DURATION],
+        "min_speaking": [cfg.MINIMUM_SPEAKING_DURATION],
+    }
+    workers = None
+    for arg in sys.argv[2:]:
+        key, _, values = arg.partition("=")
+        if key == "workers":
+            workers = int(values)
+        elif key in grid:
+            grid[key] = _parse_values(values)
+        else:
+            print(f"❌ Unknown option: {arg}")
+            sys.exit(1)
+
+    timeline = load_timeline(path)
+    duration = timeline["ts"][-1] - timeline["ts"][0] if len(timeline["ts"]) else 0
+    print(f"Timeline {timeline['meta']['session_id']}: {len(timeline['ts'])} frames, {duration / 60:.1f} min")
+
+    start = time.perf_counter()
+    results = sweep(path, grid["lip"], grid["audio"], grid["look_away"], grid["min_speaking"], workers)
+    elapsed = time.perf_counter() - start
+    print(f"Re-scored {len(results)} threshold combinations in {elapsed:.2f}s\n")
+    print(f"{'lip':>6} {'audio':>7} {'away s':>7} {'speak s':>7} | {'speaking':>8} {'looking away':>12} {'multiple':>8}")
+    for r in results:
+        print(f"{r['lip']:>6.2f} {r['audio']:>7.3f} {r['look_away']:>7.1f} {r['min_speaking']:>7.1f} | "
+              f"{r['speaking_count']:>8} {r['looking_away_count']:>12} {r['multiple_persons_count']:>8}")
+
+
+if __name__ == "__main__":
+    main()